@@ -1,11 +1,84 @@
-from .container_helpers import volume_check, set_pipettable_volume, \
-    plates_needed, sort_well_group, unique_containers, is_columnwise, \
-    stamp_shape, first_empty_well, list_of_filled_wells, well_name, \
-    container_type_checker, get_well_list_by_cont
-from .misc_helpers import user_errors_group, char_limit, printdatetime, \
-    printdate, make_list, flatten_list, det_new_group, recursive_search, \
-    transfer_properties
-from .resource_helpers import ResourceIDs, oligo_scale_default, \
-    return_dispense_media, return_agar_plates, ref_kit_container, \
-    oligo_dilution_table
-from .thermocycle_helpers import melt_curve, thermocycle_ramp
+from __future__ import absolute_import
+from importlib import import_module
+import sys
+import types
+
+# Helper modules are only imported when one of their names is first used,
+# so importing the package does not load autoprotocol and pint.
+_SUBMODULES = ("container_helpers", "magnetic_helpers", "misc_helpers",
+               "profile_helpers", "rectangle", "resource_helpers",
+               "thermocycle_helpers", "transfer_helpers", "unit_helpers")
+
+# name: helper module it is imported from
+_ATTRIBUTES = {}
+for _module, _names in [
+        ("container_helpers", [
+            "volume_check", "set_pipettable_volume", "plates_needed",
+            "sort_well_group", "unique_containers", "is_columnwise",
+            "stamp_shape", "first_empty_well", "list_of_filled_wells",
+            "well_name", "container_type_checker", "get_well_list_by_cont",
+            "WellOccupancy", "bulk_volume_check", "VolumeCheckResult",
+            "pipettable_volumes", "WellLayout", "well_layout",
+            "layout_cache_info", "set_layout_cache_size",
+            "clear_layout_cache", "PlateStamps", "stamp_shapes"]),
+        ("misc_helpers", [
+            "user_errors_group", "char_limit", "printdatetime", "printdate",
+            "make_list", "flatten_list", "det_new_group", "recursive_search",
+            "transfer_properties", "LRUCache", "iter_flatten",
+            "iter_search", "SearchPlan", "compile_search", "ordered_map"]),
+        ("resource_helpers", [
+            "ResourceIDs", "oligo_scale_default", "return_dispense_media",
+            "return_agar_plates", "ref_kit_container",
+            "oligo_dilution_table"]),
+        ("thermocycle_helpers", ["melt_curve", "thermocycle_ramp"]),
+        ("transfer_helpers", ["TransferStep", "plan_transfers"]),
+        ("unit_helpers", [
+            "parse_quantity", "base_magnitude", "to_microliters",
+            "to_seconds", "to_celsius", "to_unit", "parse_cache_info",
+            "set_parse_cache_size", "clear_parse_cache"])]:
+    for _name in _names:
+        _ATTRIBUTES[_name] = _module
+del _module, _names, _name
+
+__all__ = sorted(_ATTRIBUTES)
+
+
+def _load(namespace, name):
+    """Import the helper module providing name and cache it in namespace"""
+    if name in _ATTRIBUTES:
+        module = import_module("." + _ATTRIBUTES[name], __name__)
+        value = getattr(module, name)
+    elif name in _SUBMODULES:
+        value = import_module("." + name, __name__)
+    else:
+        raise AttributeError("module %r has no attribute %r" % (__name__,
+                                                                 name))
+    namespace[name] = value
+    return value
+
+
+def __getattr__(name):
+    return _load(globals(), name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_ATTRIBUTES) | set(_SUBMODULES))
+
+
+if sys.version_info < (3, 7):
+    # Module level __getattr__ (PEP 562) is only used from Python 3.7 on,
+    # before that the package is replaced by a module with __getattr__.
+    class _LazyModule(types.ModuleType):
+        def __getattr__(self, name):
+            return _load(self.__dict__, name)
+
+        def __dir__(self):
+            return sorted(set(self.__dict__) | set(_ATTRIBUTES) |
+                          set(_SUBMODULES))
+
+    _lazy = _LazyModule(__name__, __doc__)
+    _lazy.__dict__.update(globals())
+    # keep the original module alive, Python 2 clears the globals of
+    # modules that are garbage collected
+    _lazy.__dict__["_original_module"] = sys.modules[__name__]
+    sys.modules[__name__] = _lazy
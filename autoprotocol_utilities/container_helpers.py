@@ -1,19 +1,48 @@
 from autoprotocol.container import Container, WellGroup, Well
 from autoprotocol.container_type import _CONTAINER_TYPES
 from autoprotocol.unit import Unit
-from misc_helpers import flatten_list
-from rectangle import binary_list, chop_list, max_rectangle, \
-    get_quadrant_binary_list, get_well_in_quadrant
-from collections import namedtuple, Counter
-from operator import itemgetter
+from misc_helpers import flatten_list, LRUCache, ordered_map
+from unit_helpers import to_microliters, to_unit
+from rectangle import row_masks, mask_runs, max_rectangle_bitmask, \
+    decompose_rectangles, quadrant_to_plate, PLATE_LAYOUTS, \
+    QUADRANT_LAYOUTS, QUADRANT_POSITIONS
+from collections import namedtuple, OrderedDict
+from operator import attrgetter
+import json
 import math
 import sys
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 if sys.version_info[0] >= 3:
     string_type = str
 else:
     string_type = basestring
 
+# (well_count, col_count): columnwise position of every well index
+_COLUMNWISE_POSITIONS = {}
+
+# (analysis, well_count, col_count, bitmask of the well indices, options):
+# result of well_layout or the rectangles of stamp_shape, see
+# layout_cache_info
+_LAYOUTS = LRUCache(maxsize=512)
+
+# Wells and their volume in microliters, see pipettable_volumes
+PipettableVolumes = namedtuple('PipettableVolumes', 'wells volumes')
+
+# A stampable shape, see stamp_shape
+Stamp = namedtuple('Stamp', 'start_well shape remaining_wells included_wells')
+
+# Stamps of one container of a multi container plan, see stamp_shapes
+PlateStamps = namedtuple('PlateStamps', 'container stamps remaining_wells')
+
+# How wells are laid out in their container, see well_layout
+WellLayout = namedtuple('WellLayout', 'container orientation aligned start '
+                        'end count rows columns')
+
 
 def list_of_filled_wells(wells, empty=False):
     """
@@ -21,8 +50,9 @@ def list_of_filled_wells(wells, empty=False):
 
     Parameters
     ----------
-    wells : Container, WellGroup, list
-        Takes a container (uses all wells), a WellGroup or a List of wells
+    wells : Container, WellGroup, list, WellOccupancy
+        Takes a container (uses all wells), a WellGroup or a List of wells.
+        A WellOccupancy answers from its index without looking at the wells.
     empty : bool
         If True return empty wells instead of filled
 
@@ -37,6 +67,8 @@ def list_of_filled_wells(wells, empty=False):
         If wells are not of type list, WellGroup or Container
 
     """
+    if isinstance(wells, WellOccupancy):
+        return wells.empty() if empty else wells.filled()
     assert isinstance(wells, (Container, WellGroup, list))
     if isinstance(wells, Container):
         wells = wells.all_wells()
@@ -56,10 +88,16 @@ def first_empty_well(wells, return_index=True):
     """
     Get the first empty well of a container followed by only empty wells
 
+    Wells with a volume of zero count as empty and well 0 is never
+    returned, so a container without volumes gives well 1. A WellOccupancy
+    of the container gives the same answer.
+
     Parameters
     ----------
-    wells : Container, WellGroup, list
-        Can accept a container, WellGroup or list of wells
+    wells : Container, WellGroup, list, WellOccupancy
+        Can accept a container, WellGroup or list of wells. Sequential
+        filling loops should pass a WellOccupancy, which answers in
+        constant time.
     return_index : bool, optional
         Default true, if true returns the index of the well, if false the
         well itself
@@ -79,6 +117,8 @@ def first_empty_well(wells, return_index=True):
         If wells are not of type list, WellGroup or Container
 
     """
+    if isinstance(wells, WellOccupancy):
+        return wells.first_empty(return_index)
     assert isinstance(wells, (Container, WellGroup, list))
     if isinstance(wells, Container):
         wells = list(wells.all_wells())
@@ -86,8 +126,13 @@ def first_empty_well(wells, return_index=True):
         assert len(unique_containers(wells)) == 1
         wells = list(sort_well_group(wells))
 
-    last_well = max(wells, key=lambda x: x.index if x.volume else 0)
-    next_index = wells.index(last_well) + 1
+    # wells are in index order, so the last filled well is found scanning
+    # backwards from the end
+    next_index = 1
+    for i in range(len(wells) - 1, 0, -1):
+        if wells[i].volume and wells[i].index:
+            next_index = i + 1
+            break
     if len(wells) > next_index:
         well = wells[next_index]
     else:
@@ -99,10 +144,215 @@ def first_empty_well(wells, return_index=True):
     return well
 
 
+class WellOccupancy(object):
+    """Index of the filled wells of a container
+
+    Keeps one bit per well so filled, empty and first empty well queries do
+    not have to look at every well. A well counts as filled if its volume is
+    not None, like in `list_of_filled_wells`. `first_empty` answers like
+    `first_empty_well` on the container instead, see there.
+
+    Volumes changed through the index (`set_volume`) are tracked
+    automatically. After volumes were changed elsewhere, e.g. by protocol
+    instructions, call `update` with the affected wells or `refresh`.
+
+    Example
+    -------
+
+    .. code-block:: python
+
+        occupancy = WellOccupancy(dest_plate)
+        for src in sources:
+            dest = occupancy.next_empty(3)
+            p.transfer(src, dest, "10:microliter")
+            occupancy.update(dest)
+
+    Parameters
+    ----------
+    container : Container
+        The container to index
+
+    Raises
+    ------
+    ValueError
+        If container is not of type Container
+
+    """
+
+    def __init__(self, container):
+        assert isinstance(container, Container)
+        self.container = container
+        self._all = (1 << container.container_type.well_count) - 1
+        self.refresh()
+
+    def refresh(self):
+        """Re-read the volumes of all wells"""
+        filled = 0
+        # wells with a volume other than zero, for first_empty
+        nonzero = 0
+        for well in self.container.all_wells():
+            if well.volume is not None:
+                filled |= 1 << well.index
+                if well.volume:
+                    nonzero |= 1 << well.index
+        self._filled = filled
+        self._nonzero = nonzero
+
+    def update(self, wells):
+        """Re-read the volumes of the given wells
+
+        Parameters
+        ----------
+        wells : Well, WellGroup, list
+            Wells of the container whose volume changed
+
+        """
+        if isinstance(wells, Well):
+            wells = [wells]
+        for well in wells:
+            assert well.container is self.container
+            bit = 1 << well.index
+            if well.volume is None:
+                self._filled &= ~bit
+            else:
+                self._filled |= bit
+            if well.volume:
+                self._nonzero |= bit
+            else:
+                self._nonzero &= ~bit
+
+    def set_volume(self, wells, volume):
+        """Set the volume of wells and update the index
+
+        Parameters
+        ----------
+        wells : Well, WellGroup, list
+            Wells of the container
+        volume : str, Unit, None
+            New volume, None empties the wells
+
+        """
+        if isinstance(wells, Well):
+            wells = [wells]
+        for well in wells:
+            if volume is None:
+                well.volume = None
+            else:
+                well.set_volume(volume)
+        self.update(wells)
+
+    def is_filled(self, well):
+        """True if the well (or well index) is filled"""
+        index = well.index if isinstance(well, Well) else well
+        return bool(self._filled >> index & 1)
+
+    def _wells(self, mask, n=None, return_index=False):
+        found = []
+        for start, end in mask_runs(mask):
+            found.extend(range(start, end))
+            if n is not None and len(found) >= n:
+                found = found[:n]
+                break
+        if return_index:
+            return found
+        return [self.container.well(i) for i in found]
+
+    def filled(self, return_index=False):
+        """All filled wells in index order
+
+        Parameters
+        ----------
+        return_index : bool, optional
+            Return well indices instead of wells
+
+        Returns
+        -------
+        list
+            Filled wells or their indices
+
+        """
+        return self._wells(self._filled, return_index=return_index)
+
+    def empty(self, n=None, return_index=False):
+        """Empty wells in index order, including gaps between filled wells
+
+        Parameters
+        ----------
+        n : int, optional
+            Only return the first n empty wells
+        return_index : bool, optional
+            Return well indices instead of wells
+
+        Returns
+        -------
+        list
+            Empty wells or their indices
+
+        """
+        return self._wells(self._all & ~self._filled, n, return_index)
+
+    def first_empty(self, return_index=True):
+        """The first empty well that is only followed by empty wells
+
+        Same as `first_empty_well` on the container: wells with a volume of
+        zero count as empty and the answer is never well 0, so an empty
+        container gives well 1.
+
+        Parameters
+        ----------
+        return_index : bool, optional
+            Return the well index instead of the well
+
+        Returns
+        -------
+        well, int
+            The well or its index OR
+        None
+            If the last well is filled
+
+        """
+        index = max(self._nonzero.bit_length(), 1)
+        if index >= self.container.container_type.well_count:
+            return None
+        return index if return_index else self.container.well(index)
+
+    def next_empty(self, n, return_index=False):
+        """The next n wells after the last filled well
+
+        Parameters
+        ----------
+        n : int
+            Number of wells needed
+        return_index : bool, optional
+            Return well indices instead of a WellGroup
+
+        Returns
+        -------
+        WellGroup, list
+            The wells or their indices OR
+        None
+            If fewer than n wells are left after the last filled well
+
+        """
+        start = self._filled.bit_length()
+        if start + n > self.container.container_type.well_count:
+            return None
+        if return_index:
+            return list(range(start, start + n))
+        return self.container.wells_from(start, n)
+
+    def __len__(self):
+        return bin(self._filled).count('1')
+
+    def __repr__(self):
+        return "WellOccupancy(%s, %s filled)" % (self.container, len(self))
+
+
 def unique_containers(wells):
     """Get unique containers
 
-    Get a list of unique containers for a list of wells
+    Get a list of unique containers for a list of wells, in the order in
+    which they first appear
 
     Parameters
     ----------
@@ -126,11 +376,44 @@ def unique_containers(wells):
     " a Well, list of wells or a WellGroup"
     if isinstance(wells, WellGroup):
         wells = list(wells)
-    wells = flatten_list(wells)
-    cont = list(set([well.container for well in wells]))
+    if any(isinstance(well, list) for well in wells):
+        wells = flatten_list(wells)
+    cont = []
+    seen = set()
+    for well in wells:
+        if well.container not in seen:
+            seen.add(well.container)
+            cont.append(well.container)
     return cont
 
 
+def columnwise_positions(container_type):
+    """Columnwise position of every well index of a container type
+
+    The positions are computed once per plate geometry and shared by all
+    containers with that geometry.
+
+    Parameters
+    ----------
+    container_type : ContainerType
+
+    Returns
+    -------
+    tuple
+        Position of well `i` when counting wells columnwise
+
+    """
+    key = (container_type.well_count, container_type.col_count)
+    positions = _COLUMNWISE_POSITIONS.get(key)
+    if positions is None:
+        cols = container_type.col_count
+        rows = container_type.well_count // cols
+        positions = tuple((i % cols) * rows + i // cols
+                          for i in range(container_type.well_count))
+        _COLUMNWISE_POSITIONS[key] = positions
+    return positions
+
+
 def sort_well_group(wells, columnwise=False):
     """Sort a well group in rowwise or columnwise format.
 
@@ -164,29 +447,38 @@ def sort_well_group(wells, columnwise=False):
         wells = WellGroup(wells)
     assert isinstance(wells, WellGroup), "wells must be an instance"
     " of the WellGroup class or of type list"
-    well_list = [(
-        well,
-        well.container.id,
-        well.container.name,
-        well.container.decompose(well)[0],
-        well.container.decompose(well)[1]
-        ) for well in wells
-    ]
+
+    # one integer key per well: container rank (by id and name) followed by
+    # the rowwise (= well index) or columnwise position of the well
+    offsets = {}
+    for well in wells:
+        offsets.setdefault(well.container, None)
+    stride = max([c.container_type.well_count for c in offsets] or [0])
+    ranks = dict((key, i) for i, key in enumerate(
+        sorted(set((c.id, c.name) for c in offsets))))
+    for c in offsets:
+        offsets[c] = ranks[(c.id, c.name)] * stride
 
     if columnwise:
-        sorted_well_list = sorted(well_list, key=itemgetter(1, 2, 4, 3))
+        positions = dict((c, columnwise_positions(c.container_type))
+                         for c in offsets)
+        sorted_wells = sorted(
+            wells, key=lambda w: offsets[w.container] +
+            positions[w.container][w.index])
     else:
-        sorted_well_list = sorted(well_list, key=itemgetter(1, 2, 3, 4))
+        sorted_wells = sorted(
+            wells, key=lambda w: offsets[w.container] + w.index)
 
-    sorted_well_group = WellGroup([well[0] for well in sorted_well_list])
-    return sorted_well_group
+    return WellGroup(sorted_wells)
 
 
-def stamp_shape(wells, full=True, quad=False):
+def stamp_shape(wells, full=True, quad=False, multi=False, min_size=1,
+                optimal=False):
     """Determine if a list of wells is stampable
 
     Find biggest reactangle that can be stamped from a list of wells. Can be
-    any rectangle, or enforce full row or column span.
+    any rectangle, or enforce full row or column span. Works on 6, 24, 96,
+    384 and 1536 well plates.
     If a list of wells from a container that cannot be stamped is provided,
     all wells will be returned in `remaining_wells` of the stamp shape.
 
@@ -199,21 +491,37 @@ def stamp_shape(wells, full=True, quad=False):
         If true will only return shapes that span either the full rows or
         columns of the container.
     quad: bool, optional
-        Set to true if you want to get the stamp shape for a 384 well testing
-        all quadrants. False is used for determining col- vs row-wise. True
-        is used to initiate the correct stamping.
+        Set to true if you want to get the stamp shape for a 384 or 1536
+        well plate testing all quadrants (4 or 16 quadrants of 96 wells).
+        False is used for determining col- vs row-wise. True is used to
+        initiate the correct stamping. Other plates have no quadrants.
+    multi: bool, optional
+        If true, keep taking the biggest remaining shape until no shape of
+        at least `min_size` wells is left and return all of them as an
+        ordered stamp plan. With `full` every shape spans full rows or
+        columns.
+    min_size: int, optional
+        Smallest number of wells worth a stamp when `multi` is used.
+    optimal: bool, optional
+        With `multi`, search for the plan that needs the fewest operations
+        (stamps plus remaining single wells) instead of taking the biggest
+        shape first. The search is bounded, so very large layouts may get a
+        plan that is only better than the greedy one, not optimal.
 
     Returns
     -------
     list
-        contains namedtuples where each tuple has the following parameters
+        contains namedtuples where each tuple has the following parameters.
+        With `quad` there is one tuple per quadrant, with `multi` one per
+        stamp of the plan.
 
     start_well: well
         is the top left well for the source stamp group
     shape: dict
         is a dict of `rows` and `columns` describing the stamp shape
     remainging_wells: list
-        is a list of wells that are not included in the stamp shape
+        is a list of wells that are not included in the stamp shape (or in
+        any of the shapes returned)
     included_wells: list
         is a list of wells that is included in the stamp shape
 
@@ -253,92 +561,448 @@ def stamp_shape(wells, full=True, quad=False):
         cont = wells
         wells = list_of_filled_wells(wells)
     elif isinstance(wells, (list, WellGroup)):
-        assert len(unique_containers(wells)) == 1, "Stamp_shape: wells have "
-        "to come from one container"
+        conts = unique_containers(wells)
+        assert len(conts) == 1, "Stamp_shape: wells have to come from one "
+        "container"
         for well in wells:
             assert isinstance(well, Well), "Stamp_shape: elements of wells"
             " have to be of type Well"
-        wells = sort_well_group(wells)
-        cont = unique_containers(wells)[0]
+        cont = conts[0]
+        if _stampable(cont.container_type):
+            # same order as sort_well_group for wells of one container
+            wells = sorted(wells, key=attrgetter("index"))
+        else:
+            wells = sort_well_group(wells)
     else:
         raise RuntimeError("Stamp_shape: wells has to be a list or a "
                            "WellGroup")
 
-    def make_stamp_tuple(r, rows, cols, q=None):
+    if not _stampable(cont.container_type):
+        return [Stamp(start_well=None,
+                      shape=dict(rows=0, columns=0),
+                      remaining_wells=wells,
+                      included_wells=[])]
+
+    # first well per index, so duplicates behave like the list scans did
+    wells_by_index = {}
+    for well in wells:
+        wells_by_index.setdefault(well.index, well)
+    task = _stamp_task(cont, wells_by_index, full, quad, multi, min_size,
+                       optimal)
+    return _make_stamps(wells, wells_by_index, task,
+                        _cached_stamp_rects(task))
+
+
+def stamp_shapes(wells, full=True, quad=False, multi=False, min_size=1,
+                 optimal=False, executor=None, processes=None,
+                 chunksize=None):
+    """Stamp shapes of wells from many containers
+
+    Groups the wells by container in one pass and returns for every
+    container what `stamp_shape` returns for its wells. Layouts that are
+    in the layout cache (see `layout_cache_info`) are not analyzed again.
+    With an executor the layouts that are not cached are analyzed
+    concurrently, which pays off for expensive analyses like optimal=True
+    (over a second per 1536 well plate).
+
+    .. code-block:: python
+
+        plan = stamp_shapes(source_wells, multi=True)
+        for plate in plan:
+            for s in plate.stamps:
+                if s.start_well:
+                    p.stamp(s.start_well, dest_plate.well(0),
+                            "10:microliter", s.shape)
+            leftover.extend(plate.remaining_wells)
+
+    Parameters
+    ----------
+    wells: Container, list, WellGroup
+        Wells, or containers of which all filled wells are used
+    full, quad, multi, min_size, optimal: optional
+        See `stamp_shape`
+    executor : str, object, optional
+        Analyze the layouts that are not cached in a "thread" or "process"
+        pool or any pool or executor object with a `map` method, see
+        `misc_helpers.ordered_map`. The analysis is pure Python, so only
+        processes are faster. Default is serial.
+    processes : int, optional
+        Number of workers of the "thread" or "process" pool, defaults to
+        the number of CPUs
+    chunksize : int, optional
+        Number of layouts sent to a worker at once
+
+    Returns
+    -------
+    list
+        PlateStamps namedtuples in the order the containers first appear,
+        with the following parameters
+
+    container: Container
+        The container
+    stamps: list
+        Stamp namedtuples of the container, see `stamp_shape`
+    remaining_wells: list
+        Wells of the container that are not in any of the stamps
+
+    Raises
+    ------
+    ValueError
+        If wells are not of type Container, list or WellGroup
+    ValueError
+        If elements of wells are not of type Well or Container
+
+    """
+    if isinstance(wells, Container):
+        wells = [wells]
+    assert isinstance(wells, (list, WellGroup)), "stamp_shapes: wells has " \
+        "to be a Container, a list or a WellGroup"
+    groups = OrderedDict()
+    for item in wells:
+        if isinstance(item, Well):
+            group = groups.get(item.container)
+            if group is None:
+                group = groups[item.container] = []
+            group.append(item)
+        else:
+            assert isinstance(item, Container), "stamp_shapes: elements " \
+                "of wells have to be of type Well or Container"
+            group = groups.get(item)
+            if group is None:
+                group = groups[item] = []
+            group.extend(list_of_filled_wells(item))
+
+    # rectangles of the layouts analyzed by the executor, by cache key, so
+    # a small layout cache does not drop them before they are used
+    analyzed = {}
+    if executor is not None:
+        missing = OrderedDict()
+        for cont, cont_wells in groups.items():
+            if _stampable(cont.container_type):
+                # a tuple of indices, the wells do not have to be pickled
+                task = _stamp_task(cont, tuple(set(w.index
+                                                   for w in cont_wells)),
+                                   full, quad, multi, min_size, optimal)
+                key = _stamp_key(task)
+                if key not in missing and key not in _LAYOUTS:
+                    missing[key] = task
+        results = ordered_map(_stamp_rects, list(missing.values()),
+                              executor, chunksize, processes)
+        for key, rects in zip(missing, results):
+            analyzed[key] = _LAYOUTS[key] = rects
+
+    plan = []
+    for cont, cont_wells in groups.items():
+        if not _stampable(cont.container_type):
+            stamps = [Stamp(start_well=None,
+                            shape=dict(rows=0, columns=0),
+                            remaining_wells=sort_well_group(cont_wells),
+                            included_wells=[])]
+        else:
+            cont_wells = sorted(cont_wells, key=attrgetter("index"))
+            wells_by_index = {}
+            for well in cont_wells:
+                wells_by_index.setdefault(well.index, well)
+            task = _stamp_task(cont, wells_by_index, full, quad, multi,
+                               min_size, optimal)
+            rects = analyzed.get(_stamp_key(task)) if analyzed else None
+            if rects is None:
+                rects = _cached_stamp_rects(task)
+            stamps = _make_stamps(cont_wells, wells_by_index, task, rects)
+        plan.append(PlateStamps(container=cont, stamps=stamps,
+                                remaining_wells=stamps[0].remaining_wells))
+    return plan
+
+
+def _stampable(container_type):
+    """Whether stamp_shape can analyze wells of the container type, plates
+    of one of the PLATE_LAYOUTS formats"""
+    layout = PLATE_LAYOUTS.get(container_type.well_count)
+    return layout is not None and layout[1] == container_type.col_count
+
+
+def _stamp_task(cont, indices, full, quad, multi, min_size, optimal):
+    """Everything `_stamp_rects` needs to know about the wells of a plate,
+    indices is an iterable of the distinct well indices"""
+    container_type = cont.container_type
+    well_count = container_type.well_count
+    return (well_count, container_type.col_count, indices, full,
+            quad and well_count in QUADRANT_LAYOUTS, multi, min_size,
+            optimal)
+
+
+def _stamp_key(task):
+    """Key of the layout cache for the rectangles of a stamp task"""
+    well_count, cols, indices, full, quad, multi, min_size, optimal = task
+    return ("stamp", well_count, cols, _index_mask(indices), full, quad,
+            multi, min_size if multi else None, optimal if multi else None)
+
+
+def _cached_stamp_rects(task):
+    """`_stamp_rects` through the layout cache"""
+    key = _stamp_key(task)
+    rects = _LAYOUTS.get(key)
+    if rects is None:
+        rects = _stamp_rects(task)
+        _LAYOUTS[key] = rects
+    return rects
+
+
+def _stamp_grid(well_count, cols, quad):
+    """Rows and columns of the grid the rectangles are searched in"""
+    rows = well_count // cols
+    if quad:
+        factor = QUADRANT_LAYOUTS[well_count][2]
+        return rows // factor, cols // factor
+    return rows, cols
+
+
+def _stamp_rects(task):
+    """(quadrant or None, Rect) of every shape of a stamp task"""
+    well_count, cols, indices, full, quad, multi, min_size, optimal = task
+    grid_rows, grid_cols = _stamp_grid(well_count, cols, quad)
+    if quad:
+        quads = QUADRANT_LAYOUTS[well_count][2] ** 2
+        quad_masks = [[0] * grid_rows for _ in range(quads)]
+        positions = QUADRANT_POSITIONS[well_count]
+        for index in indices:
+            q, position = positions[index]
+            quad_masks[q][position // grid_cols] |= \
+                1 << (position % grid_cols)
+        grids = list(enumerate(quad_masks))
+    else:
+        grids = [(None, row_masks(list(indices), cols, grid_rows))]
+    if multi:
+        return tuple((q, r) for q, masks in grids
+                     for r in decompose_rectangles(masks, grid_cols,
+                                                   min_size, full, optimal))
+    return tuple((q, max_rectangle_bitmask(masks, grid_cols))
+                 for q, masks in grids)
+
+
+def _make_stamps(wells, wells_by_index, task, rects):
+    """Stamp namedtuples of the rectangles of a stamp task"""
+    well_count, cols, indices, full, quad, multi, min_size, optimal = task
+    grid_rows, grid_cols = _stamp_grid(well_count, cols, quad)
+
+    # with several stamps (multi or quad) the wells of a stamp are
+    # collected per index instead of scanning all wells for every stamp
+    if len(rects) < 2:
+        by_index = None
+    else:
+        by_index = {}
+        for well in wells:
+            group = by_index.get(well.index)
+            if group is None:
+                group = by_index[well.index] = []
+            group.append(well)
+
+    def make_stamp(r, q=None):
         height = r.height
         width = r.width
-        if full:
-            if not (r.height == rows or r.width == cols):
-                height = 0
-                width = 0
-        if width != 0 or height != 0:
-            start_index = (r.y * cols) + r.x
-        else:
-            start_index = None
-        wells_included = []
-        for y in range(height):
-            for z in range(width):
-                wells_included.append(start_index + y * cols + z)
+        if full and not (height == grid_rows or width == grid_cols):
+            height = 0
+            width = 0
+        included = [(r.y + y) * grid_cols + r.x + x
+                    for y in range(height) for x in range(width)]
         if q is not None:
-            wells_included = get_well_in_quadrant(wells_included, q)
-            if width != 0 or height != 0:
-                start_index = get_well_in_quadrant([start_index], q)[0]
-
-        wells_idx_remaining = [x.index for x in wells if x.index not in
-                               wells_included]
-        if start_index is not None:
-            start_well = [x for x in wells if x.index == start_index][0]
+            included = quadrant_to_plate(included, q, well_count)
+        if by_index is None:
+            included_set = set(included)
+            included_wells = [x for x in wells if x.index in included_set]
         else:
-            start_well = start_index
-        wells_remaining = [x for x in wells if x.index in wells_idx_remaining]
-        wells_included = [x for x in wells if x.index in wells_included]
-        r = stamp_shape(start_well=start_well,
-                        shape=dict(rows=height, columns=width),
-                        remaining_wells=wells_remaining,
-                        included_wells=wells_included)
-        return r
-
-    stamp_shape = namedtuple(
-        'Stamp', 'start_well shape remaining_wells included_wells')
-    rows = cont.container_type.row_count()
-    cols = cont.container_type.col_count
-    well_count = cont.container_type.well_count
-    indices = [x.index for x in wells]
-
-    if well_count not in (96, 384):
-        shape = stamp_shape(start_well=None,
-                            shape=dict(rows=0, columns=0),
-                            remaining_wells=wells,
-                            included_wells=[])
-        return [shape]
-
-    bnry_list = [bnry for bnry in binary_list(indices, length=well_count)]
-    if well_count == 384 and quad:
-        bnry_list_list = get_quadrant_binary_list(bnry_list)
-        temp_shape = []
-        temp_remaining_wells = []
-        remaining_wells = []
-        for i, bnry_list in enumerate(bnry_list_list):
-            bnry_mat = chop_list(bnry_list, 12)
-            r = max_rectangle(bnry_mat, value=1)
-            temp_shape.append(make_stamp_tuple(r, rows / 2, cols / 2, i))
-            temp_remaining_wells.append(temp_shape[i].remaining_wells)
-        temp_remaining_wells = Counter(flatten_list(temp_remaining_wells))
-        for k, v in temp_remaining_wells.iteritems():
-            if v == 4:
-                remaining_wells.append(k)
-        shape = []
-        for s in temp_shape:
-            shape.append(stamp_shape(start_well=s.start_well,
-                                     shape=s.shape,
-                                     remaining_wells=remaining_wells,
-                                     included_wells=s.included_wells))
-    else:
-        bnry_mat = chop_list(bnry_list, cols)
-        r = max_rectangle(bnry_mat, value=1)
-        shape = [make_stamp_tuple(r, rows, cols)]
+            included_wells = []
+            for index in sorted(included):
+                included_wells.extend(by_index.get(index, ()))
+        start_well = None
+        if included:
+            start_well = wells_by_index[min(included)]
+        return Stamp(start_well=start_well,
+                     shape=dict(rows=height, columns=width),
+                     remaining_wells=None,
+                     included_wells=included_wells)
+
+    shape = [make_stamp(r, q) for q, r in rects]
+    if multi and not shape:
+        shape = [Stamp(start_well=None,
+                       shape=dict(rows=0, columns=0),
+                       remaining_wells=None,
+                       included_wells=[])]
+
+    stamped = set()
+    for s in shape:
+        stamped.update(x.index for x in s.included_wells)
+    remaining_wells = [x for x in wells if x.index not in stamped]
+    return [s._replace(remaining_wells=remaining_wells) for s in shape]
+
+
+def layout_cache_info():
+    """Statistics of the cache of analyzed well layouts
+
+    `well_layout`, `is_columnwise` and `stamp_shape` cache their analysis
+    by plate geometry and the set of well indices, so repeated calls on
+    the same layout only look the result up. The key is computed from the
+    wells of every call, so a container whose filled wells changed is
+    analyzed again without invalidating anything.
+
+    Returns
+    -------
+    CacheInfo
+        namedtuple of hits, misses, maxsize and currsize
+
+    """
+    return _LAYOUTS.info()
+
+
+def set_layout_cache_size(maxsize):
+    """Change how many analyzed well layouts are cached
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of cached layouts
+
+    """
+    _LAYOUTS.resize(maxsize)
+
+
+def clear_layout_cache():
+    """Empty the cache of analyzed well layouts and reset its statistics"""
+    _LAYOUTS.clear()
+
+
+def _index_mask(indices):
+    """Bitmask with the bits of the well indices set"""
+    mask = 0
+    for i in indices:
+        mask |= 1 << i
+    return mask
+
+
+def _layout(indices, container_type):
+    """Cached `_classify_layout`"""
+    key = ("layout", container_type.well_count, container_type.col_count,
+           _index_mask(indices))
+    layout = _LAYOUTS.get(key)
+    if layout is None:
+        layout = _classify_layout(indices, container_type)
+        _LAYOUTS[key] = layout
+    return layout
+
+
+def _classify_layout(indices, container_type):
+    """orientation, aligned, start, end, rows and columns of a set of well
+    indices of a container type, see well_layout"""
+    cols = container_type.col_count
+    rows = container_type.well_count // cols
+    count = len(indices)
+    first = min(indices)
+    last = max(indices)
+    min_col = min(i % cols for i in indices)
+    max_col = max(i % cols for i in indices)
+    height = last // cols - first // cols + 1
+    width = max_col - min_col + 1
+    positions = [(i % cols) * rows + i // cols for i in indices]
+    first_pos = min(positions)
+    last_pos = max(positions)
+    if last_pos - first_pos + 1 == count:
+        # consecutive when counting columnwise
+        start = (first_pos % rows) * cols + first_pos // rows
+        end = (last_pos % rows) * cols + last_pos // rows
+        return "columnwise", start < cols, start, end, height, width
+    if last - first + 1 == count:
+        return "rowwise", first % cols == 0, first, last, height, width
+    top_left = first // cols * cols + min_col
+    if height * width == count:
+        return "block", top_left == 0, top_left, last, height, width
+    return "scattered", False, first, last, height, width
+
+
+def well_layout(wells):
+    """Classify how wells are laid out in their container
+
+    Works on the well indices only, in one pass over the wells and without
+    listing the wells of the container. The orientation is one of
+
+    - "columnwise": the wells are consecutive when counting columnwise, like
+      ``wells_from(start, n, columnwise=True)``
+    - "rowwise": the wells are consecutive when counting rowwise
+    - "block": the wells fill a rectangle
+    - "scattered": any other layout
+
+    The first one that applies is used, so a single well or a full column
+    is "columnwise" and a full row "rowwise".
+
+    Patterns (4x6 plate):
+
+    .. code-block:: none
+
+        columnwise | rowwise | block | scattered
+        x x        | x x x x |       | x
+        x          | x x     |   x x |     x
+        x          |         |   x x |   x
+        x          |         |       |
 
-    return shape
+    Parameters
+    ----------
+    wells: Well, list, WellGroup
+        Wells of one container, duplicates are counted once
+
+    Returns
+    -------
+    WellLayout
+        namedtuple with the following fields
+
+    container: Container
+        Container of the wells
+    orientation: str
+        "columnwise", "rowwise", "block" or "scattered"
+    aligned: bool
+        Whether the layout starts at the top of a column ("columnwise"), at
+        the start of a row ("rowwise") or at the first well of the
+        container ("block")
+    start: int
+        Index of the first well, counting columnwise for "columnwise" and
+        rowwise otherwise. The top left well for "block".
+    end: int
+        Index of the last well, counting the same way
+    count: int
+        Number of distinct wells
+    rows: int
+        Number of rows spanned by the wells
+    columns: int
+        Number of columns spanned by the wells
+
+    Raises
+    ------
+    ValueError
+        If wells are not of type Well, list or WellGroup, or empty
+    ValueError
+        If elements of wells are not of type Well
+    ValueError
+        If wells are not from one container only
+
+    """
+    if isinstance(wells, Well):
+        wells = [wells]
+    assert isinstance(wells, (list, WellGroup)), "well_layout: wells has to " \
+        "be a Well, a list or a WellGroup"
+    assert len(wells) > 0, "well_layout: wells can not be empty"
+    cont = None
+    indices = set()
+    for well in wells:
+        assert isinstance(well, Well), "well_layout: elements of wells have " \
+            "to be of type Well"
+        if cont is None:
+            cont = well.container
+        assert well.container is cont, "well_layout: wells have to come " \
+            "from one container"
+        indices.add(well.index)
+    orientation, aligned, start, end, rows, columns = _layout(
+        indices, cont.container_type)
+    return WellLayout(container=cont, orientation=orientation,
+                      aligned=aligned, start=start, end=end,
+                      count=len(indices), rows=rows, columns=columns)
 
 
 def is_columnwise(wells):
@@ -366,6 +1030,8 @@ def is_columnwise(wells):
           x x  | x      |
           x x  | x x x  |
 
+    See `well_layout` for a description of other layouts.
+
     Parameters
     ----------
     wells: Well, list, WellGroup
@@ -397,44 +1063,25 @@ def is_columnwise(wells):
         If elements of wells are not of type Well
 
     """
-
-    em = []
-    colwise = False
     if isinstance(wells, Well):
-        colwise = False
-    else:
-        assert isinstance(wells, (list, WellGroup)), "is_columnwise: wells"
-        " has to be a list or a WellGroup"
-        for well in wells:
-            assert isinstance(well, (Well)), "is_columnwise: elements of "
-            "wells have to be of type Well"
-        if len(unique_containers(wells)) != 1:
-            em.append("is_columnwise: wells have to come from one container")
-
-    cont = unique_containers(wells)[0]
-
-    all_wells = list(cont.all_wells(columnwise=True))
-    top_wells = list(cont.wells_from(0, cont.container_type.col_count))
-    wells = sort_well_group(wells, columnwise=True)
-
-    if wells[0] in top_wells:
-        top_well = top_wells[top_wells.index(wells[0])]
-        start = all_wells.index(top_well)
-        for x in range(len(wells)):
-            if wells[x] == all_wells[start]:
-                colwise = True
-                start += 1
-            else:
-                colwise = False
-                break
-    else:
-        colwise = False
-
-    em = filter(None, em)
-    if len(em) > 0:
-        return em
-    else:
-        return colwise
+        return False
+    assert isinstance(wells, (list, WellGroup)), "is_columnwise: wells"
+    " has to be a list or a WellGroup"
+    indices = set()
+    conts = set()
+    for well in wells:
+        assert isinstance(well, (Well)), "is_columnwise: elements of "
+        "wells have to be of type Well"
+        indices.add(well.index)
+        conts.add(well.container)
+    if len(conts) != 1:
+        return ["is_columnwise: wells have to come from one container"]
+    if len(indices) != len(wells):
+        # a repeated well breaks the columnwise sequence
+        return False
+    orientation, aligned = _layout(indices,
+                                   conts.pop().container_type)[:2]
+    return orientation == "columnwise" and aligned
 
 
 def plates_needed(wells_needed, wells_available):
@@ -487,6 +1134,62 @@ def plates_needed(wells_needed, wells_available):
     return int(math.ceil(wells_needed / wells_available))
 
 
+def pipettable_volumes(well, use_safe_vol=False):
+    """Pipettable volume of wells, without changing them
+
+    Computes the volume `set_pipettable_volume` would set: the well volume
+    minus the dead volume (default) or safe minimum volume of its
+    container, for all wells of a container at once.
+
+    .. code-block:: python
+
+        res = pipettable_volumes(plate)
+        # wells with more than 10 microliter to spare
+        [w for w, vol in zip(res.wells, res.volumes) if vol > 10]
+
+    Parameters
+    ----------
+    well : Container, WellGroup, list, Well
+        For a Container all filled wells are used
+    use_safe_vol : bool, optional
+        Instead of removing the indicated dead_volume, remove the safe minimum
+        volume
+
+    Returns
+    -------
+    PipettableVolumes
+        namedtuple of the wells, grouped by container, and their pipettable
+        volumes in microliters (numpy.ndarray if numpy is installed, list
+        otherwise)
+
+    Raises
+    ------
+    ValueError
+        If a well does not have a volume
+
+    """
+    wells = []
+    volumes = []
+    corrections = []
+    for c, w in _wells_by_container(well).items():
+        correction_vol = c.container_type.dead_volume_ul
+        if use_safe_vol:
+            correction_vol = c.container_type.safe_min_volume_ul
+        for x in w:
+            assert x.volume is not None, "%s does not have a volume" % x
+            volumes.append(to_microliters(x.volume))
+        wells.extend(w)
+        corrections.extend([to_microliters(correction_vol)] * len(w))
+
+    if np is not None:
+        volumes = np.array(volumes, dtype=float) - \
+            np.array(corrections, dtype=float)
+    else:
+        volumes = [vol - correction for vol, correction in zip(volumes,
+                                                               corrections)]
+    return PipettableVolumes(wells, volumes)
+
+
 def set_pipettable_volume(well, use_safe_vol=False):
     """Remove dead volume from pipettable volume.
 
@@ -509,28 +1212,41 @@ def set_pipettable_volume(well, use_safe_vol=False):
     Will return the same type as was received
     (Container, WellGroup, list, Well)
 
+    Raises
+    ------
+    ValueError
+        If a well does not have a volume
+
     """
+    pipettable = pipettable_volumes(well, use_safe_vol)
+    # microliters per unit of the wells, to write every volume back in the
+    # unit the well had
+    factors = {}
+    for aliquot, volume in zip(pipettable.wells, pipettable.volumes):
+        units = aliquot.volume.units
+        factor = factors.get(units)
+        if factor is None:
+            factor = factors[units] = to_microliters(Unit(1, units))
+        aliquot.set_volume(Unit(float(volume) / factor, units))
 
-    cont = {}
+    return well
+
+
+def _wells_by_container(well):
+    """Wells of a Container, WellGroup, list or Well grouped by container,
+    a Container contributes its filled wells"""
+    cont = OrderedDict()
     if isinstance(well, (list, WellGroup)):
-        cont = get_well_list_by_cont(well)
+        cont = get_well_list_by_cont(well, ordered=True)
     elif isinstance(well, Container):
         cont[well] = list_of_filled_wells(well)
     elif isinstance(well, Well):
         cont[well.container] = [well]
-
-    for c, w in cont.iteritems():
-        correction_vol = c.container_type.dead_volume_ul
-        if use_safe_vol:
-            correction_vol = c.container_type.safe_min_volume_ul
-        for x in w:
-            x.set_volume(x.volume - correction_vol)
-
-    return well
+    return cont
 
 
 def volume_check(well, usage_volume=0, use_safe_vol=False,
-                 use_safe_dead_diff=False):
+                 use_safe_dead_diff=False, structured=False):
     """Basic Volume check
 
     Checks to see if the designated well has usage_volume above the well's
@@ -566,13 +1282,18 @@ def volume_check(well, usage_volume=0, use_safe_vol=False,
         Use the safe_minimum_volume - dead_volume as the required amount.
         Useful if `set_pipettable_volume()` was used before to correct the
         well_volume to not include the dead_volume anymore
+    structured : bool, optional
+        Return the `VolumeCheckResult` instead of the error string. Its
+        messages are only formatted when it is converted to a string.
 
     Returns
     -------
     str
         string of errors if volume check failed OR
     None
-        If no errors are detected
+        If no errors are detected OR
+    VolumeCheckResult
+        If structured is True
 
     Raises
     ------
@@ -583,61 +1304,261 @@ def volume_check(well, usage_volume=0, use_safe_vol=False,
 
     """
 
-    assert isinstance(well, (Well, WellGroup, list))
-    if isinstance(well, Well):
-        well = [well]
+    result = bulk_volume_check(well, usage_volume, use_safe_vol,
+                               use_safe_dead_diff)
+    if structured:
+        return result
+    if result:
+        return str(result)
+    return None
 
-    error_message = []
-    # noinspection PyTypeChecker
-    for aliquot in well:
-        assert isinstance(aliquot, Well)
-        if isinstance(usage_volume, (int, float)):
-            usage_volume = Unit(usage_volume, "microliter")
-        if isinstance(usage_volume, string_type):
-            usage_volume = int(usage_volume.split(":microliter")[0])
-        if not aliquot.volume:
-            error_message.append(
-                "Your aliquot does not have a volume. (%s) We assume 0 uL "
-                "for this test." % aliquot)
-
-        correction_vol = aliquot.container.container_type.dead_volume_ul
-        message_string = "dead volume"
-        volume = Unit(0, "microliter")
-        if aliquot.volume:
-            volume = aliquot.volume
-        if use_safe_vol:
-            correction_vol = \
-                aliquot.container.container_type.safe_min_volume_ul
-            message_string = "safe minimum volume"
-        elif use_safe_dead_diff:
-            correction_vol = \
-                aliquot.container.container_type.safe_min_volume_ul - \
-                aliquot.container.container_type.dead_volume_ul
-            message_string = "safe minimum volume"
-            volume = volume + aliquot.container.container_type.dead_volume_ul
-        test_vol = correction_vol + usage_volume
-
-        if test_vol > volume:
+
+class VolumeCheckResult(object):
+    """Result of `bulk_volume_check`
+
+    Records the wells that failed the check with their required and
+    available volumes in microliters. Error messages are only built when
+    asked for: `str` gives the message of `volume_check`, `to_json` a
+    numeric report.
+
+    Attributes
+    ----------
+    failing_wells : list
+        Wells that do not have enough volume
+    required : list, numpy.ndarray
+        Required volume of each failing well in microliters
+    available : list, numpy.ndarray
+        Available volume of each failing well in microliters
+    missing_volume : list
+        Wells without a volume, they are checked as 0 microliter
+    usage_volume : Unit
+        The tested usage volume
+    correction : str
+        Minimum volume the wells were checked against, one of "dead",
+        "safe" or "safe_dead_diff"
+
+    """
+
+    def __init__(self, failing_wells, required, available, missing_volume,
+                 usage_volume, correction, positions):
+        self.failing_wells = failing_wells
+        self.required = required
+        self.available = available
+        self.missing_volume = missing_volume
+        self.usage_volume = usage_volume
+        self.correction = correction
+        # (position in the checked wells, is failure) of every error
+        self._positions = positions
+        self._message = None
+
+    def error_messages(self):
+        """Build the error message of every failing well and every well
+        without a volume, in the order volume_check reports them
+
+        Returns
+        -------
+        list
+            List of strings
+
+        """
+        messages = []
+        usage_volume = self.usage_volume
+        failing = iter(self.failing_wells)
+        missing = iter(self.missing_volume)
+        for position, is_failure in self._positions:
+            if not is_failure:
+                messages.append(
+                    "Your aliquot does not have a volume. (%s) We assume 0 "
+                    "uL for this test." % next(missing))
+                continue
+            aliquot = next(failing)
+            container_type = aliquot.container.container_type
+            correction_vol = container_type.dead_volume_ul
+            volume = aliquot.volume or Unit(0, "microliter")
+            if self.correction == "safe":
+                correction_vol = container_type.safe_min_volume_ul
+            elif self.correction == "safe_dead_diff":
+                correction_vol = container_type.safe_min_volume_ul - \
+                    container_type.dead_volume_ul
+                volume = volume + container_type.dead_volume_ul
             if usage_volume == 0:
-                error_message.append(
+                messages.append(
                     "You want to pipette from a container with {:~P} {!s}. "
                     "However, your aliquot: {!s}, only has {:~P}.".format(
-                        correction_vol, message_string,
+                        correction_vol, self.correction_name,
                         well_name(aliquot), volume))
             else:
-                error_message.append(
+                messages.append(
                     "You want to pipette {:~P} from a container with {:~P} "
                     "{!s} ({:~P} total). However, your aliquot: {!s}, only has"
                     " {:~P}.".format(
-                        usage_volume, correction_vol, message_string,
+                        usage_volume, correction_vol, self.correction_name,
                         usage_volume + correction_vol,
                         well_name(aliquot), volume))
-    if error_message:
-        error_message = str(len(error_message)) + " volume errors: " + \
-            ", ".join(error_message)
+        return messages
+
+    @property
+    def correction_name(self):
+        if self.correction == "dead":
+            return "dead volume"
+        return "safe minimum volume"
+
+    def to_dict(self):
+        """Numeric summary of the check
+
+        Returns
+        -------
+        dict
+            Number of errors, usage volume, correction and per well
+            container, index, name, required and available microliters
+
+        """
+        return {
+            "errors": len(self),
+            "usage_volume": str(self.usage_volume),
+            "correction": self.correction,
+            "failing_wells": [{
+                "container": well.container.name,
+                "index": well.index,
+                "name": well_name(well),
+                "required_ul": float(required),
+                "available_ul": float(available)
+            } for well, required, available in zip(
+                self.failing_wells, self.required, self.available)],
+            "missing_volume": [{
+                "container": well.container.name,
+                "index": well.index,
+                "name": well_name(well)
+            } for well in self.missing_volume]
+        }
+
+    def to_json(self, **kwargs):
+        """`to_dict` as a JSON string, kwargs are passed to json.dumps"""
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def __str__(self):
+        if self._message is None:
+            messages = self.error_messages()
+            self._message = str(len(messages)) + " volume errors: " + \
+                ", ".join(messages)
+        return self._message
+
+    def __repr__(self):
+        return "VolumeCheckResult(%s failing, %s without volume)" % (
+            len(self.failing_wells), len(self.missing_volume))
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __nonzero__(self):
+        return bool(self._positions)
+
+    __bool__ = __nonzero__
+
+
+def bulk_volume_check(well, usage_volume=0, use_safe_vol=False,
+                      use_safe_dead_diff=False):
+    """Volume check for many wells at once
+
+    Same check as `volume_check`, but well volumes are read once into
+    microliter floats and compared against the dead or safe minimum volume
+    of their container type in one go (with NumPy if installed). Messages
+    are only built for failing wells, and only when asked for.
+
+    .. code-block:: python
+
+        result = bulk_volume_check(plate.all_wells(), usage_volume=5)
+        if result:
+            print(len(result.failing_wells))
+            user_errors_group(result.error_messages())
+
+    Parameters
+    ----------
+    well : Well, WellGroup, list
+        Well(s) to test
+    usage_volume : Unit, str, int, float, optional
+        Volume to test for. If int or float is used, microliter will be
+        assumed.
+    use_safe_vol : bool, optional
+        Use safe minimum volume instead of dead volume
+    use_safe_dead_diff : bool, optional
+        Use the safe_minimum_volume - dead_volume as the required amount.
+
+    Returns
+    -------
+    VolumeCheckResult
+        False in a boolean context if no errors were found
+
+    Raises
+    ------
+    ValueError
+        If well is not of type Well, list or WellGroup
+    ValueError
+        If elements of well are not of type Well
+
+    """
+    assert isinstance(well, (Well, WellGroup, list))
+    if isinstance(well, Well):
+        well = [well]
+    usage_ul = to_microliters(usage_volume)
+    if isinstance(usage_volume, (int, float)):
+        usage_volume = Unit(usage_volume, "microliter")
+    elif isinstance(usage_volume, string_type):
+        usage_volume = to_unit(usage_volume)
+
+    correction = "dead"
+    if use_safe_vol:
+        correction = "safe"
+    elif use_safe_dead_diff:
+        correction = "safe_dead_diff"
+
+    # (required, added to the well volume) per container type
+    thresholds = {}
+    required = []
+    available = []
+    missing = []
+    for aliquot in well:
+        assert isinstance(aliquot, Well)
+        container_type = aliquot.container.container_type
+        threshold = thresholds.get(id(container_type))
+        if threshold is None:
+            dead = to_microliters(container_type.dead_volume_ul)
+            safe = to_microliters(container_type.safe_min_volume_ul)
+            if use_safe_vol:
+                threshold = (safe + usage_ul, 0.0)
+            elif use_safe_dead_diff:
+                threshold = (safe - dead + usage_ul, dead)
+            else:
+                threshold = (dead + usage_ul, 0.0)
+            thresholds[id(container_type)] = threshold
+        required.append(threshold[0])
+        if aliquot.volume:
+            available.append(to_microliters(aliquot.volume) + threshold[1])
+        else:
+            available.append(threshold[1])
+            missing.append(len(required) - 1)
+
+    if np is not None:
+        required = np.array(required)
+        available = np.array(available)
+        failing = np.flatnonzero(required > available).tolist()
     else:
-        error_message = None
-    return error_message
+        failing = [i for i, (req, avail) in enumerate(zip(required,
+                                                          available))
+                   if req > avail]
+
+    positions = sorted([(i, False) for i in missing] +
+                       [(i, True) for i in failing])
+    return VolumeCheckResult(
+        failing_wells=[well[i] for i in failing],
+        required=required[failing] if np is not None else
+        [required[i] for i in failing],
+        available=available[failing] if np is not None else
+        [available[i] for i in failing],
+        missing_volume=[well[i] for i in missing],
+        usage_volume=usage_volume,
+        correction=correction,
+        positions=positions)
 
 
 def well_name(well, alternate_name=None, humanize=False):
@@ -761,13 +1682,19 @@ def container_type_checker(containers, shortname, exclude=False):
     return error_message
 
 
-def get_well_list_by_cont(wells):
+def get_well_list_by_cont(wells, ordered=False):
     """Get wells sorted by container
 
+    Groups the wells in a single pass. The wells of each container keep
+    their input order.
+
     Parameters
     ----------
     wells: list, WellGroup
         The list of wells to be sorted by the containers that they are in
+    ordered: bool, optional
+        If true, return an OrderedDict with the containers in the order in
+        which they first appear in wells
 
     Returns
     -------
@@ -783,14 +1710,13 @@ def get_well_list_by_cont(wells):
 
     """
     assert isinstance(wells, (list, WellGroup))
+
+    well_map = OrderedDict() if ordered else {}
     for well in wells:
         assert isinstance(well, Well)
-
-    conts = unique_containers(wells)
-    well_map = {}
-    for cont in conts:
-        well_map[cont] = []
-        well_map[cont].extend(
-            [well for well in wells if well.container == cont])
+        group = well_map.get(well.container)
+        if group is None:
+            group = well_map[well.container] = []
+        group.append(well)
 
     return well_map
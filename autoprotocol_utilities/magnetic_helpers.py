@@ -1,4 +1,5 @@
-from autoprotocol_utilities import list_of_filled_wells
+from container_helpers import list_of_filled_wells
+from unit_helpers import base_magnitude
 from autoprotocol.container import Container
 import sys
 
@@ -52,10 +53,11 @@ def get_mag_amplicenter(plate, amplitude_fraction=1.0):
     assert isinstance(plate, Container)
     assert isinstance(amplitude_fraction, float)
     assert amplitude_fraction <= 1.0
-    max_cont_vol = plate.container_type.well_volume_ul
-    max_vol = max([x.volume for x in list_of_filled_wells(plate)])
+    max_cont_vol = base_magnitude(plate.container_type.well_volume_ul)
+    max_vol = max([base_magnitude(x.volume)
+                   for x in list_of_filled_wells(plate)])
 
-    ratio = float(max_vol.to_base_units() / max_cont_vol.to_base_units())
+    ratio = max_vol / max_cont_vol
 
     return {"center": ratio / 2, "amplitude": ratio / 2 / amplitude_fraction}
 
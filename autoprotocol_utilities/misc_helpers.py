@@ -1,14 +1,22 @@
 from autoprotocol import UserError
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 from autoprotocol.container import Well, WellGroup
+from functools import partial
+from itertools import islice
+from multiprocessing.pool import ThreadPool
 import datetime
+import multiprocessing
 import sys
+import threading
 
 if sys.version_info[0] >= 3:
     string_type = str
 else:
     string_type = basestring
 
+# Statistics of a LRUCache, see LRUCache.info
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
 
 def user_errors_group(error_msgs, info=None):
     """Takes a list error messages and neatly displays as a single UserError
@@ -100,14 +108,59 @@ def make_list(my_str, integer=False):
     return my_str
 
 
-def flatten_list(l):
+def iter_flatten(l, types=(list,)):
+    """Iterate over the elements of arbitrarily nested lists
+
+    Walks the nesting with an explicit stack instead of recursion, so deep
+    structures do not hit the recursion limit and no intermediate lists are
+    built.
+
+    .. code-block:: python
+
+        from autoprotocol_utilities.misc_helpers import iter_flatten
+
+        for well in iter_flatten(params["sources"],
+                                 types=(list, tuple, WellGroup)):
+            ...
+
+    Parameters
+    ----------
+    l : list, object
+        Nested list to flatten. Anything else is yielded as is.
+    types : type, tuple, optional
+        Types that are flattened, defaults to lists only
+
+    Returns
+    -------
+    generator
+        Elements in depth first order
+
+    """
+    if not isinstance(l, types):
+        yield l
+        return
+    stack = [iter(l)]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, types):
+                stack.append(iter(item))
+                break
+            yield item
+        else:
+            stack.pop()
+
+
+def flatten_list(l, types=(list,)):
     """
-    Flatten a list recursively without for loops or additional modules
+    Flatten a nested list, eager version of `iter_flatten`
 
     Parameters
     ---------
     l : list
         List to flatten
+    types : type, tuple, optional
+        Types that are flattened, defaults to lists only. Use
+        ``(list, tuple, WellGroup)`` to flatten those as well.
 
     Example Usage:
         .. code-block:: python
@@ -132,10 +185,7 @@ def flatten_list(l):
         If l is not of type list
 
     """
-    if isinstance(l, list):
-        return [x for sublist in l for x in flatten_list(sublist)]
-    else:
-        return [l]
+    return list(iter_flatten(l, types))
 
 
 def det_new_group(i, base=0):
@@ -220,12 +270,14 @@ def char_limit(label, length=22, trunc=False, clip=False):
     return r(label=label, error_message=error_message)
 
 
-def recursive_search(params, class_name=None, method=None, args={}):
+def recursive_search(params, class_name=None, method=None, args={},
+                     executor=None, chunksize=None, processes=None):
     """Recursive params checker
 
     Iterates through all items of a passed in dict, tuple, or list
     and either returns everything as a list, returns an optional subset of them
-    or calls a specified method on the subset
+    or calls a specified method on the subset. See `iter_search` to stream
+    the results instead.
 
     Parameters
     ----------
@@ -238,6 +290,24 @@ def recursive_search(params, class_name=None, method=None, args={}):
         must include class name.
     args : parameters, optional
         Parameters to pass to a method, if desired.
+    executor : str, object, optional
+        Call method on the found items concurrently: "thread" for a thread
+        pool, "process" for a process pool, or any pool or executor object
+        with a `map` method, like a `concurrent.futures` executor. Results
+        are in the order of the found items, the same as without executor.
+        "thread" and "process" make a pool per call, pass a pool to reuse
+        it across many calls.
+        Threads only pay off for methods that wait, e.g. on files or web
+        requests; pure Python methods like volume_check hold the GIL and get
+        slower. With processes, method, args and items have to be picklable
+        and changes the method makes to the items are not seen by the
+        caller. Pickled autoprotocol Units come back as pint Quantities, so
+        helpers checking for Unit, like volume_check, do not work there.
+    chunksize : int, optional
+        Number of items sent to a worker at once
+    processes : int, optional
+        Number of workers of the "thread" or "process" pool, defaults to the
+        number of CPUs
 
     Returns
     -------
@@ -276,40 +346,394 @@ def recursive_search(params, class_name=None, method=None, args={}):
 
     """
 
-    all_fields = []
+    if executor is None or not (class_name and method):
+        return list(iter_search(params, class_name, method, args))
+    if not hasattr(method, '__call__'):
+        raise Exception("Method called has no method __call__")
+    found = list(iter_search(params, class_name))
+    if args:
+        method = partial(method, **args)
+    responses = ordered_map(method, found, executor, chunksize, processes)
+    return [response for response in responses if response is not None]
+
+
+def ordered_map(func, items, executor, chunksize=None, processes=None):
+    """Results of func for all items, in the order of the items, computed
+    concurrently
 
-    def find_all_fields(params):
-        if isinstance(params, dict):
-            for key, value in params.iteritems():
-                all_fields.append(key)
-                find_all_fields(value)
-        elif isinstance(params, list) or isinstance(params, tuple):
-            for item in params:
-                find_all_fields(item)
+    Parameters
+    ----------
+    func : function
+        Function called with every item. For processes it has to be
+        picklable, e.g. a module level function
+    items : list
+        Items to call func with, picklable for processes
+    executor : str, object
+        "thread" for a thread pool, "process" for a process pool, or any
+        pool or executor object with a `map` method, like a
+        `concurrent.futures` executor. "thread" and "process" make a pool
+        per call, pass a pool to reuse it across many calls. Threads only
+        pay off for functions that wait, pure Python functions hold the GIL.
+    chunksize : int, optional
+        Number of items sent to a worker at once
+    processes : int, optional
+        Number of workers of the "thread" or "process" pool, defaults to the
+        number of CPUs
+
+    Returns
+    -------
+    list
+        func(item) of every item
+
+    Raises
+    ------
+    ValueError
+        If executor is not "thread" or "process" and has no map method
+
+    """
+    if executor in ("thread", "process"):
+        if executor == "thread":
+            pool = ThreadPool(processes)
+        else:
+            pool = multiprocessing.Pool(processes)
+        try:
+            return pool.map(func, items, chunksize)
+        finally:
+            pool.close()
+            # joining a thread pool waits up to 0.1 s for its handler
+            # threads, the idle workers exit on their own after close
+            if executor == "process":
+                pool.join()
+    assert hasattr(executor, "map"), ("executor has to be 'thread', "
+                                      "'process' or have a map method")
+    if chunksize is None:
+        return list(executor.map(func, items))
+    return list(executor.map(func, items, chunksize=chunksize))
+
+
+def _iter_fields(params, class_name=None):
+    """Keys and leaves of nested dicts, lists and tuples in the order
+    recursive_search finds them, optionally only instances of class_name"""
+    nested = (dict, list, tuple)
+    if not isinstance(params, nested):
+        if class_name is None or isinstance(params, class_name):
+            yield params
+        return
+    # (iterator over the items, whether the items are dict key value pairs)
+    stack = [(iter(params.items()), True) if isinstance(params, dict)
+             else (iter(params), False)]
+    while stack:
+        items, is_dict = stack[-1]
+        for item in items:
+            if is_dict:
+                key, item = item
+                if class_name is None or isinstance(key, class_name):
+                    yield key
+            if isinstance(item, nested):
+                stack.append((iter(item.items()), True)
+                             if isinstance(item, dict)
+                             else (iter(item), False))
+                break
+            if class_name is None or isinstance(item, class_name):
+                yield item
         else:
-            all_fields.append(params)
+            stack.pop()
+
+
+def iter_search(params, class_name=None, method=None, args={}, limit=None):
+    """Streaming version of `recursive_search`
+
+    Walks the structure iteratively and filters by class while walking,
+    without collecting all fields first. Method results are computed as
+    they are consumed, so stopping early (or `limit`) skips the rest of the
+    structure.
+
+    .. code-block:: python
+
+        from autoprotocol.container import Well
+        from autoprotocol_utilities.misc_helpers import iter_search
+
+        # first well in the launch parameters, if any
+        first = next(iter_search(params, Well), None)
+
+        # stop validating after 10 errors
+        errors = list(iter_search(params, Well, volume_check, limit=10))
+
+    Parameters
+    ----------
+    params : list, tuple or dict
+        Structure to parse
+    class_name : Class name, optional
+        Optionally return only instances of a class.
+    method : function, optional
+        A function that will be applied to all instances found of a class,
+        must include class name.
+    args : parameters, optional
+        Parameters to pass to a method, if desired.
+    limit : int, optional
+        Stop after this many results
 
-    find_all_fields(params)
+    Returns
+    -------
+    generator
+        Same items as `recursive_search` returns, in the same order
 
+    Raises
+    ------
+    Exception
+        If method is not callable
+
+    """
+    if class_name and method and not hasattr(method, '__call__'):
+        raise Exception("Method called has no method __call__")
+    results = _iter_fields(params, class_name or None)
     if class_name:
-        found_instances = []
-        for field in all_fields:
-            if isinstance(field, class_name):
-                found_instances.append(field)
         if method:
-            method_msgs = []
-            if hasattr(method, '__call__'):
-                for found in found_instances:
-                    response = method(found, **args)
-                    if response is not None:
-                        method_msgs.append(response)
-            else:
-                raise Exception("Method called has no method __call__")
-            return method_msgs
+            results = (response for response in
+                       (method(found, **args) for found in results)
+                       if response is not None)
+    if limit is not None:
+        results = islice(results, limit)
+    return results
+
+
+def _iter_paths(params, class_name):
+    """(path, item) of the instances of class_name in the order
+    `_iter_fields` finds them, a path is the keys and indices leading to
+    the item, ending with a `_DictKey` for items that are dict keys"""
+    nested = (dict, list, tuple)
+    if not isinstance(params, nested):
+        if isinstance(params, class_name):
+            yield (), params
+        return
+    # (iterator over (key or index, item), whether it is a dict, path)
+    stack = [(iter(params.items()), True, ()) if isinstance(params, dict)
+             else (enumerate(params), False, ())]
+    while stack:
+        items, is_dict, path = stack[-1]
+        for step, item in items:
+            if is_dict and isinstance(step, class_name):
+                yield path + (_DictKey(step),), step
+            if isinstance(item, nested):
+                stack.append((iter(item.items()), True, path + (step,))
+                             if isinstance(item, dict)
+                             else (enumerate(item), False, path + (step,)))
+                break
+            if isinstance(item, class_name):
+                yield path + (step,), item
         else:
-            return found_instances
-    else:
-        return all_fields
+            stack.pop()
+
+
+class _DictKey(namedtuple('_DictKey', 'key')):
+    """Last step of a path to a dict key"""
+
+
+# schema of a value that is neither nested nor an instance, see _schema
+_LEAF = "leaf"
+
+
+def _schema(params, class_name):
+    """Schema of nested parameters for SearchPlan: None for an instance of
+    class_name, _LEAF for any other value that is not nested, else (whether
+    it is a dict, its length, its keys in order or None for a list or
+    tuple, the keys or indices of its leaves, [(key or index, whether the
+    key is an instance, schema of the item)] of its other items in reverse
+    order)"""
+    nested = (dict, list, tuple)
+
+    def node(value):
+        if isinstance(value, nested):
+            is_dict = isinstance(value, dict)
+            return (is_dict, len(value), list(value) if is_dict else None,
+                    [], [])
+        return None if isinstance(value, class_name) else _LEAF
+
+    root = node(params)
+    stack = [(params, root)] if isinstance(params, nested) else []
+    while stack:
+        value, (is_dict, size, keys, leaves, branches) = stack.pop()
+        for step in (keys if is_dict else range(size)):
+            item = value[step]
+            child = node(item)
+            key_found = is_dict and isinstance(step, class_name)
+            if child is _LEAF and not key_found:
+                leaves.append(step)
+            else:
+                branches.append((step, key_found, child))
+            if isinstance(item, nested):
+                stack.append((item, child))
+        branches.reverse()
+    return root
+
+
+class SearchPlan(object):
+    """Paths to the instances of a class in nested parameters, made by
+    `compile_search`
+
+    `search` checks the input against the compiled schema while it
+    collects the instances: every dict has to have the same keys, every
+    list and tuple the same length, instances of the class have to be where
+    the plan has them and no other value may be an instance or nested. If
+    anything differs, the input has another schema and `search` falls back
+    to `recursive_search`, so a plan never returns an incomplete result.
+    Use a plan for inputs that share their schema, like the launch
+    parameters of one protocol.
+
+    Attributes
+    ----------
+    class_name : Class name
+        Class the plan finds instances of
+    paths : list
+        Tuples of the keys and indices leading to every instance, in the
+        order `recursive_search` finds them
+    hits : int
+        Searches answered from the paths
+    misses : int
+        Searches that fell back to `recursive_search`
+
+    """
+
+    def __init__(self, class_name, paths, root):
+        self.class_name = class_name
+        self.paths = paths
+        self.hits = 0
+        self.misses = 0
+        # schema of the compiled parameters, see _schema
+        self._root = root
+        # types known to be neither nested nor class_name
+        self._leaf_types = set()
+
+    def _lookup(self, params):
+        """Instances in params in the order `recursive_search` finds them,
+        or None if params does not match the compiled schema"""
+        class_name = self.class_name
+        nested = (dict, list, tuple)
+        leaf_types = self._leaf_types
+        found = []
+        stack = [(params, self._root)]
+        while stack:
+            value, schema = stack.pop()
+            if schema is None:
+                if isinstance(value, nested) or \
+                        not isinstance(value, class_name):
+                    return None
+                found.append(value)
+                continue
+            if schema is _LEAF:
+                if not self._is_leaf(type(value)):
+                    return None
+                continue
+            is_dict, size, keys, leaves, branches = schema
+            if is_dict:
+                # same keys in the same order, so recursive_search finds
+                # the instances in the compiled order
+                if not isinstance(value, dict) or list(value) != keys:
+                    return None
+            elif not isinstance(value, (list, tuple)) or len(value) != size:
+                return None
+            # the types of the leaves at once, most inputs repeat a few
+            if branches:
+                types = set(map(type, map(value.__getitem__, leaves)))
+            else:
+                types = set(map(type, value.values() if is_dict else value))
+            if not types <= leaf_types:
+                for leaf_type in types - leaf_types:
+                    if not self._is_leaf(leaf_type):
+                        return None
+            # branches are in reverse, the stack pops them in order; the
+            # value of an instance key is checked even if it is a leaf
+            for step, key_found, child in branches:
+                stack.append((value[step], child))
+                if key_found:
+                    stack.append((step, None))
+        return found
+
+    def _is_leaf(self, value_type):
+        """Whether values of value_type are neither nested nor instances"""
+        if value_type in self._leaf_types:
+            return True
+        if issubclass(value_type, (dict, list, tuple, self.class_name)):
+            return False
+        self._leaf_types.add(value_type)
+        return True
+
+    def search(self, params, method=None, args={}):
+        """Same as ``recursive_search(params, class_name, method, args)``
+
+        Parameters
+        ----------
+        params : list, tuple or dict
+            Structure to search, with the schema of the compiled one
+        method : function, optional
+            A function that will be applied to all instances found.
+        args : parameters, optional
+            Parameters to pass to a method, if desired.
+
+        Returns
+        -------
+        list
+            The found instances, or the responses (if not None) of method
+            called on them
+
+        Raises
+        ------
+        Exception
+            If method is not callable
+
+        """
+        if method and not hasattr(method, '__call__'):
+            raise Exception("Method called has no method __call__")
+        found = self._lookup(params)
+        if found is None:
+            self.misses += 1
+            return recursive_search(params, self.class_name, method, args)
+        self.hits += 1
+        if not method:
+            return found
+        return [response for response in
+                (method(item, **args) for item in found)
+                if response is not None]
+
+    def __repr__(self):
+        return "SearchPlan(%s, %s paths)" % (
+            getattr(self.class_name, "__name__", self.class_name),
+            len(self.paths))
+
+
+def compile_search(params, class_name):
+    """Compile the schema of nested parameters and the paths to the
+    instances of a class in them, to search inputs of the same schema
+
+    .. code-block:: python
+
+        from autoprotocol.container import Well
+        from autoprotocol_utilities.misc_helpers import compile_search
+
+        plan = compile_search(first_params, Well)
+        for params in launches:
+            errors = plan.search(params, volume_check)
+
+    Parameters
+    ----------
+    params : list, tuple or dict
+        Structure with the schema of the inputs to search
+    class_name : Class name
+        Class to find instances of
+
+    Returns
+    -------
+    SearchPlan
+
+    Raises
+    ------
+    ValueError
+        If class_name is not given
+
+    """
+    assert class_name, "class_name is required"
+    paths = [path for path, item in _iter_paths(params, class_name)]
+    return SearchPlan(class_name, paths, _schema(params, class_name))
 
 
 def transfer_properties(src_wells, dest_wells, properties={}, args={},
@@ -394,3 +818,100 @@ def transfer_properties(src_wells, dest_wells, properties={}, args={},
         return error_messages
     else:
         return None
+
+
+class LRUCache(object):
+    """Bounded mapping that evicts the least recently used entry
+
+    Counts hits and misses of `get` so the size can be tuned for long
+    running processes. Values are shared between callers, so only store
+    values that are not changed after they are cached.
+
+    .. code-block:: python
+
+        cache = LRUCache(maxsize=2)
+        cache["a"] = 1
+        cache["b"] = 2
+        cache.get("a")
+        cache["c"] = 3  # evicts "b"
+        cache.info()
+        # CacheInfo(hits=1, misses=0, maxsize=2, currsize=2)
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum number of entries, at least 1
+
+    Raises
+    ------
+    ValueError
+        If maxsize is not a positive int
+
+    """
+
+    def __init__(self, maxsize=128):
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.resize(maxsize)
+
+    def get(self, key, default=None):
+        """Value of key, marking it as most recently used
+
+        Returns default and counts a miss if key is not cached.
+        """
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def resize(self, maxsize):
+        """Change the maximum number of entries, evicting the least recently
+        used entries if needed"""
+        assert isinstance(maxsize, int) and maxsize > 0, \
+            "maxsize has to be a positive int"
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """Hits, misses, maximum and current size
+
+        Returns
+        -------
+        CacheInfo
+            namedtuple like the one of `functools.lru_cache`
+
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize,
+                         len(self._data))
+
+    def __repr__(self):
+        return "LRUCache(%s)" % (self.info(),)
@@ -0,0 +1,247 @@
+from autoprotocol.container import Container, Well, WellGroup
+from collections import deque, namedtuple
+from functools import wraps
+from timeit import default_timer
+import json
+import math
+import sys
+import threading
+import types
+
+# Timing summary of one function, see stats
+ProfileStats = namedtuple('ProfileStats', 'name calls total mean p50 p99 max '
+                          'wells containers')
+
+# function name: _Record
+_RECORDS = {}
+_LOCK = threading.Lock()
+# (namespace, name, original) of every function replaced by enable
+_PATCHED = []
+_enabled = False
+
+
+class _Record(object):
+    """Calls of one function"""
+
+    def __init__(self, samples):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.wells = 0
+        self.containers = 0
+        self.durations = deque(maxlen=samples)
+
+
+def _input_size(args, kwargs):
+    """Number of wells and distinct containers in the arguments of a call
+
+    Wells, containers and lists or WellGroups of them (also nested) are
+    counted, other arguments are ignored. A container counts all its wells.
+    """
+    wells = 0
+    containers = set()
+    stack = list(args) + list(kwargs.values())
+    while stack:
+        item = stack.pop()
+        if isinstance(item, Well):
+            wells += 1
+            containers.add(id(item.container))
+        elif isinstance(item, Container):
+            wells += item.container_type.well_count
+            containers.add(id(item))
+        elif isinstance(item, (list, tuple, WellGroup)):
+            stack.extend(item)
+    return wells, len(containers)
+
+
+def _record(name, duration, size, samples):
+    with _LOCK:
+        record = _RECORDS.get(name)
+        if record is None:
+            record = _RECORDS[name] = _Record(samples)
+        record.calls += 1
+        record.total += duration
+        record.max = max(record.max, duration)
+        record.wells += size[0]
+        record.containers += size[1]
+        record.durations.append(duration)
+
+
+def profiled(func=None, name=None, samples=10000):
+    """Decorator recording calls of a function while profiling is enabled
+
+    When profiling is disabled the only overhead is one flag check per
+    call. The public helpers of the package do not need this decorator,
+    `enable` wraps them.
+
+    .. code-block:: python
+
+        @profiled
+        def make_dilutions(wells):
+            ...
+
+        enable()
+        make_dilutions(plate.all_wells())
+        print(dump(fmt="text"))
+
+    Parameters
+    ----------
+    func : function
+        Function to profile
+    name : str, optional
+        Name to record the calls under, defaults to module.function
+    samples : int, optional
+        Number of most recent call durations kept for the percentiles
+
+    Returns
+    -------
+    function
+        The wrapped function, the original one is its `__wrapped__`
+        attribute
+
+    """
+    if func is None:
+        return lambda f: profiled(f, name=name, samples=samples)
+    if name is None:
+        name = "%s.%s" % (func.__module__, func.__name__)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        size = _input_size(args, kwargs)
+        start = default_timer()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _record(name, default_timer() - start, size, samples)
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+def enable():
+    """Start recording the calls of every public function of the package
+
+    The functions are replaced by `profiled` wrappers in their helper
+    module, in the package and in every helper module that imported them,
+    so calls between helpers are recorded too. `disable` restores the
+    originals, so there is no overhead when profiling is off.
+    """
+    global _enabled
+    package_name = __name__.rsplit(".", 1)[0]
+    with _LOCK:
+        _enabled = True
+        if _PATCHED:
+            return
+    package = sys.modules[package_name]
+    wrapped = {}
+    for name in package.__all__:
+        # also resolves the lazy attribute, so the package namespace holds
+        # the function before it is patched
+        func = getattr(package, name)
+        if isinstance(func, types.FunctionType):
+            wrapped[func] = profiled(func, name=name)
+    namespaces = [package.__dict__] + [
+        module.__dict__ for module_name, module in list(sys.modules.items())
+        if module_name.startswith(package_name + ".") and module is not None]
+    for namespace in namespaces:
+        for name, value in list(namespace.items()):
+            try:
+                replacement = wrapped.get(value)
+            except TypeError:
+                continue
+            if replacement is not None:
+                _PATCHED.append((namespace, name, value))
+                namespace[name] = replacement
+
+
+def disable():
+    """Stop recording and restore the original functions, the recorded
+    statistics are kept"""
+    global _enabled
+    with _LOCK:
+        _enabled = False
+        while _PATCHED:
+            namespace, name, original = _PATCHED.pop()
+            namespace[name] = original
+
+
+def is_enabled():
+    """Whether calls are recorded"""
+    return _enabled
+
+
+def reset():
+    """Forget all recorded calls"""
+    with _LOCK:
+        _RECORDS.clear()
+
+
+def _percentile(ordered, fraction):
+    """Nearest rank percentile of sorted values"""
+    return ordered[max(0, int(math.ceil(fraction * len(ordered))) - 1)]
+
+
+def stats():
+    """Timing summary of every recorded function
+
+    Returns
+    -------
+    list
+        ProfileStats namedtuples sorted by total time, slowest first. Times
+        are in seconds, p50 and p99 are computed from the most recent calls
+        only, wells and containers are summed over all calls.
+
+    """
+    with _LOCK:
+        records = [(name, record.calls, record.total, record.max,
+                    record.wells, record.containers,
+                    sorted(record.durations))
+                   for name, record in _RECORDS.items()]
+    result = [ProfileStats(name, calls, total, total / calls,
+                           _percentile(durations, 0.5),
+                           _percentile(durations, 0.99), maximum, wells,
+                           containers)
+              for name, calls, total, maximum, wells, containers, durations
+              in records]
+    return sorted(result, key=lambda s: (-s.total, s.name))
+
+
+def dump(path=None, fmt="json"):
+    """Recorded statistics as JSON or a text table
+
+    Parameters
+    ----------
+    path : str, optional
+        File to write the statistics to
+    fmt : str, optional
+        "json" or "text"
+
+    Returns
+    -------
+    str
+        The statistics
+
+    Raises
+    ------
+    ValueError
+        If fmt is not "json" or "text"
+
+    """
+    assert fmt in ("json", "text"), "fmt has to be json or text"
+    summary = stats()
+    if fmt == "json":
+        out = json.dumps([s._asdict() for s in summary], indent=2)
+    else:
+        lines = ["%-28s %8s %10s %10s %10s %10s %8s %6s" % (
+            "function", "calls", "total ms", "p50 ms", "p99 ms", "max ms",
+            "wells", "conts")]
+        for s in summary:
+            lines.append("%-28s %8d %10.3f %10.3f %10.3f %10.3f %8d %6d" % (
+                s.name, s.calls, s.total * 1000, s.p50 * 1000, s.p99 * 1000,
+                s.max * 1000, s.wells, s.containers))
+        out = "\n".join(lines)
+    if path is not None:
+        with open(path, "w") as f:
+            f.write(out + "\n")
+    return out
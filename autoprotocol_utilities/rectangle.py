@@ -1,10 +1,16 @@
 from collections import namedtuple
+import multiprocessing
 
 try:
     reduce = reduce
 except NameError:
     from functools import reduce  # py3k
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # A column in a histogram
 Column = namedtuple('Column', 'height x')
 # An area under a histogram
@@ -84,6 +90,283 @@ def max_rectangle(mat, value=0):
     return max_rect
 
 
+def row_masks(wells, cols, rows=None):
+    """Turns a list of well indices into one integer bitmask per row of a
+    plate. Bit `c` of mask `r` is set if the well in row `r`, column `c` is
+    in `wells`.
+
+    .. code-block:: none
+
+        row_masks([0, 1, 5], cols=3)
+        [3, 4]
+
+    Parameters
+    ----------
+    wells: list
+        Well indices (rowwise), do not have to be sorted
+    cols: Int
+        The number of columns of the plate
+    rows: Int, optional
+        The number of rows of the plate. Defaults to the last occupied row.
+
+    Returns
+    -------
+    List
+        One integer bitmask per row
+
+    """
+    if rows is None:
+        rows = max(wells) // cols + 1 if wells else 0
+    masks = [0] * rows
+    for well in wells:
+        masks[well // cols] |= 1 << (well % cols)
+    return masks
+
+
+def mask_runs(mask):
+    """Yields the runs of consecutive set bits of an integer bitmask as
+    (start, end) tuples, lowest bit first. `end` is exclusive.
+
+    .. code-block:: none
+
+        [run for run in mask_runs(0b1101)]
+        [(0, 1), (2, 4)]
+
+    Parameters
+    ----------
+    mask: Int
+        The bitmask to scan
+
+    Returns
+    -------
+    None
+        Yields (start, end) tuples
+
+    """
+    while mask:
+        low = mask & -mask
+        carry = mask + low
+        yield low.bit_length() - 1, (carry & -carry).bit_length() - 1
+        mask &= carry
+
+
+def max_rectangle_bitmask(masks, width):
+    """Find the largest rectangle of set bits in a plate given as row
+    bitmasks (see `row_masks`).
+
+    For every row, the masks of the rows above are AND-ed in one at a time;
+    every run of set bits in the combined mask is a candidate rectangle
+    ending in that row. Ties are resolved exactly like `max_rectangle` does,
+    so both return the same Rect for the same plate.
+
+    Parameters
+    ----------
+    masks: list
+        One integer bitmask per row
+    width: Int
+        The number of columns of the plate
+
+    Returns
+    -------
+    Rectangle
+        The maximum sized rectangle of set bits
+
+    """
+    max_rect = Rect(width=0, height=0, x=0, y=1)
+    max_area = 0
+    for row_idx, run_mask in enumerate(masks):
+        best = None
+        height = 0
+        while run_mask:
+            height += 1
+            # no rectangle ending in this row can beat max_area anymore
+            if bin(run_mask).count('1') * (row_idx + 1) <= max_area:
+                break
+            for start, end in mask_runs(run_mask):
+                # order in which max_histogram_area would visit this run
+                if end < width:
+                    rank = end * width + width - 1 - start
+                else:
+                    rank = width * width + start
+                key = ((end - start) * height, -rank)
+                if best is None or key > best[0]:
+                    best = (key, end - start, height, start)
+            if height > row_idx:
+                break
+            run_mask &= masks[row_idx - height]
+        if best is not None and best[0][0] > max_area:
+            max_area = best[0][0]
+            max_rect = Rect(width=best[1], height=best[2], x=best[3],
+                            y=row_idx - best[2] + 1)
+    return max_rect
+
+
+def max_full_rectangle_bitmask(masks, width):
+    """Find the largest rectangle of set bits that spans either all rows or
+    all columns of a plate given as row bitmasks (see `row_masks`).
+
+    Parameters
+    ----------
+    masks: list
+        One integer bitmask per row
+    width: Int
+        The number of columns of the plate
+
+    Returns
+    -------
+    Rectangle
+        The maximum sized full row or full column rectangle
+
+    """
+    full_row = (1 << width) - 1
+    max_rect = Rect(width=0, height=0, x=0, y=1)
+    # consecutive full rows
+    start = None
+    for row_idx, mask in enumerate(masks + [0]):
+        if mask & full_row == full_row:
+            if start is None:
+                start = row_idx
+        elif start is not None:
+            if row_idx - start > max_rect.height:
+                max_rect = Rect(width=width, height=row_idx - start, x=0,
+                                y=start)
+            start = None
+    # consecutive full columns
+    if masks:
+        col_mask = reduce(lambda a, b: a & b, masks)
+        for start, end in mask_runs(col_mask):
+            if (end - start) * len(masks) > area(max_rect):
+                max_rect = Rect(width=end - start, height=len(masks), x=start,
+                                y=0)
+    return max_rect
+
+
+def _clear_rect(masks, rect):
+    rect_mask = ((1 << rect.width) - 1) << rect.x
+    for row_idx in range(rect.y, rect.y + rect.height):
+        masks[row_idx] &= ~rect_mask
+
+
+def _rect_options(masks, width, row_idx, col, full):
+    """All rectangles with top left corner at (col, row_idx) that fit into
+    the set bits of masks"""
+    options = []
+    rows = len(masks)
+    if full:
+        full_row = (1 << width) - 1
+        if col == 0:
+            height = 0
+            while row_idx + height < rows and \
+                    masks[row_idx + height] == full_row:
+                height += 1
+                options.append(Rect(width=width, height=height, x=0,
+                                    y=row_idx))
+        if row_idx == 0:
+            col_mask = reduce(lambda a, b: a & b, masks)
+            for end in range(col + 1, width + 1):
+                if not col_mask >> (end - 1) & 1:
+                    break
+                rect = Rect(width=end - col, height=rows, x=col, y=0)
+                if rect not in options:
+                    options.append(rect)
+        return options
+    run_mask = -1
+    for height in range(1, rows - row_idx + 1):
+        run_mask &= masks[row_idx + height - 1]
+        if not run_mask >> col & 1:
+            break
+        end = col
+        while end < width and run_mask >> end & 1:
+            end += 1
+        for w in range(1, end - col + 1):
+            options.append(Rect(width=w, height=height, x=col, y=row_idx))
+    return options
+
+
+def decompose_rectangles(masks, width, min_area=1, full=False,
+                         optimal=False, max_nodes=20000):
+    """Split the set bits of a plate into non-overlapping rectangles.
+
+    The greedy decomposition repeatedly takes the largest remaining
+    rectangle until none of at least `min_area` bits is left. With
+    `optimal` a depth-first search looks for the decomposition with the
+    fewest operations (rectangles plus bits left over), starting from the
+    greedy result and giving up after `max_nodes` search steps.
+
+    Parameters
+    ----------
+    masks: list
+        One integer bitmask per row, see `row_masks`. Not modified.
+    width: Int
+        The number of columns of the plate
+    min_area: Int, optional
+        Smallest rectangle that is worth taking
+    full: bool, optional
+        Only use rectangles that span all rows or all columns
+    optimal: bool, optional
+        Search for the decomposition with the fewest operations
+    max_nodes: Int, optional
+        Search steps after which the best decomposition found so far is
+        returned
+
+    Returns
+    -------
+    List
+        Rectangles ordered from largest to smallest
+
+    """
+    min_area = max(min_area, 1)
+    find_max = max_full_rectangle_bitmask if full else max_rectangle_bitmask
+
+    greedy = []
+    remaining = list(masks)
+    while True:
+        rect = find_max(remaining, width)
+        if area(rect) == 0 or area(rect) < min_area:
+            break
+        greedy.append(rect)
+        _clear_rect(remaining, rect)
+
+    if not optimal:
+        return greedy
+
+    def branches(masks, rects, singles, row_idx):
+        # the first set bit is either the top left corner of a rectangle
+        # (largest first) or is left as a single
+        col = (masks[row_idx] & -masks[row_idx]).bit_length() - 1
+        options = [r for r in _rect_options(masks, width, row_idx, col, full)
+                   if area(r) >= min_area]
+        for rect in sorted(options, key=area, reverse=True):
+            next_masks = list(masks)
+            _clear_rect(next_masks, rect)
+            yield next_masks, rects + [rect], singles
+        next_masks = list(masks)
+        next_masks[row_idx] &= ~(1 << col)
+        yield next_masks, rects, singles + 1
+
+    best_rects = greedy
+    best_cost = len(greedy) + sum(bin(m).count('1') for m in remaining)
+    stack = [iter([(list(masks), [], 0)])]
+    nodes = 0
+    while stack and nodes < max_nodes:
+        state = next(stack[-1], None)
+        if state is None:
+            stack.pop()
+            continue
+        nodes += 1
+        masks, rects, singles = state
+        used = len(rects) + singles
+        row_idx = next((i for i, m in enumerate(masks) if m), None)
+        if row_idx is None:
+            if used < best_cost:
+                best_cost = used
+                best_rects = rects
+        elif used + 1 < best_cost:
+            stack.append(branches(masks, rects, singles, row_idx))
+
+    return sorted(best_rects, key=lambda r: (-area(r), r.y, r.x))
+
+
 def max_histogram_area(histogram):
     """Find height, width of the largest rectangle that fits entirely under
     the histogram.
@@ -126,6 +409,223 @@ def max_histogram_area(histogram):
     return max_area
 
 
+def _run_keys(heights, level, row_idx, total_rows):
+    """Score every maximal run of columns with height >= level that ends in
+    a column. Higher scores win; the score encodes area, row and the order in
+    which max_histogram_area visits the run, so argmax resolves ties exactly
+    like the pure python functions. Columns that do not end a run get -1."""
+    n = heights.shape[-1]
+    order_span = n * n + n
+    row_span = total_rows * order_span
+    cols = np.arange(n)
+    mask = heights >= level
+    start = np.maximum.accumulate(np.where(mask, -1, cols), axis=-1) + 1
+    end = cols + 1
+    run_end = mask.copy()
+    run_end[..., :-1] &= ~mask[..., 1:]
+    rank = np.where(end < n, end * n + n - 1 - start, n * n + start)
+    keys = (end - start) * level * row_span + \
+        (row_span - 1 - (row_idx * order_span + rank))
+    return np.where(run_end, keys, -1)
+
+
+def _decode_key(key, n, total_rows):
+    """Inverse of _run_keys: (width, height, x, row_idx) of a winning run"""
+    order_span = n * n + n
+    row_span = total_rows * order_span
+    key = int(key)
+    run_area, order = divmod(key, row_span)
+    row_idx, rank = divmod(row_span - 1 - order, order_span)
+    if rank < n * n:
+        end, start = rank // n, n - 1 - rank % n
+    else:
+        end, start = n, rank - n * n
+    width = end - start
+    return width, run_area // width, start, row_idx
+
+
+def max_histogram_area_array(histograms):
+    """Find the largest rectangle under one histogram (1D) or under each row
+    of a 2D array of histograms in one vectorized pass.
+
+    Falls back to `max_histogram_area` if NumPy is not installed. Returns the
+    same Areas as `max_histogram_area`.
+
+    Parameters
+    ----------
+    histograms: list, numpy.ndarray
+        A histogram or a 2D array of histograms
+
+    Returns
+    -------
+    Area
+        The maximum area of the histogram OR
+    List
+        The maximum area of each histogram
+
+    """
+    if np is None:
+        if histograms and isinstance(histograms[0], (list, tuple)):
+            return [max_histogram_area(h) for h in histograms]
+        return max_histogram_area(histograms)
+
+    heights = np.asarray(histograms, dtype=np.int64)
+    single = heights.ndim == 1
+    if single:
+        heights = heights[np.newaxis]
+    best = np.full(heights.shape[0], -1, dtype=np.int64)
+    top = heights.max() if heights.size else 0
+    for level in range(1, top + 1):
+        keys = _run_keys(heights, level, 0, 1).max(axis=-1)
+        best = np.maximum(best, keys)
+
+    areas = []
+    for key in best:
+        if key < 0:
+            areas.append(Area(width=0, height=0, x=0))
+        else:
+            width, height, x, _ = _decode_key(key, heights.shape[-1], 1)
+            areas.append(Area(width=width, height=height, x=x))
+    return areas[0] if single else areas
+
+
+def max_rectangle_array(mats, value=0):
+    """Find the largest rectangle containing only `value` in a plate map (2D)
+    or in each plate of a stack of plate maps (3D) in one vectorized pass.
+
+    Falls back to `max_rectangle` if NumPy is not installed. Returns the
+    same Rects as `max_rectangle`.
+
+    Parameters
+    ----------
+    mats: list, numpy.ndarray
+        A 2D plate map or a 3D stack of plate maps of the same size
+    value: int, optional
+        Value that user is looking for
+
+    Returns
+    -------
+    Rectangle
+        The maximum sized rectangle in the plate map OR
+    List
+        The maximum sized rectangle of each plate map
+
+    """
+    if np is None:
+        if mats and mats[0] and isinstance(mats[0][0], (list, tuple)):
+            return [max_rectangle(mat, value) for mat in mats]
+        return max_rectangle(mats, value)
+
+    mats = np.asarray(mats)
+    single = mats.ndim == 2
+    if single:
+        mats = mats[np.newaxis]
+    plates, rows, cols = mats.shape
+    best = np.full(plates, -1, dtype=np.int64)
+    heights = np.zeros((plates, cols), dtype=np.int64)
+    for row_idx in range(rows):
+        heights = np.where(mats[:, row_idx, :] == value, heights + 1, 0)
+        for level in range(1, heights.max() + 1 if heights.size else 1):
+            keys = _run_keys(heights, level, row_idx, rows).max(axis=-1)
+            best = np.maximum(best, keys)
+
+    rects = []
+    for key in best:
+        if key < 0:
+            rects.append(Rect(width=0, height=0, x=0, y=1))
+        else:
+            width, height, x, row_idx = _decode_key(key, cols, rows)
+            rects.append(Rect(width=width, height=height, x=x,
+                              y=row_idx - height + 1))
+    return rects[0] if single else rects
+
+
+def _max_rectangle_chunk(args):
+    mats, value = args
+    if np is None:
+        # bitmask rows give the same Rect as max_rectangle, only faster
+        return [max_rectangle_bitmask(
+            [sum(1 << c for c, el in enumerate(row) if el == value)
+             for row in mat], len(mat[0]) if mat else 0) for mat in mats]
+    return max_rectangle_array(np.asarray(mats), value)
+
+
+def max_rectangles(mats, value=0, processes=None, chunk_size=256,
+                   executor=None):
+    """Find the largest rectangle containing only `value` for many plate
+    maps at once.
+
+    Plate maps of the same size are analyzed together with
+    `max_rectangle_array`. Large batches can be spread over a process pool.
+    The plate maps are pickled to the workers, which costs more than it
+    saves for most batches: 2000 384 well maps took 532 ms with
+    ``processes=4`` against 318 ms serially, and still 460 ms with a
+    reused pool on one CPU. Only use processes for far larger batches on a
+    machine with several CPUs, and pass a pool as `executor` so it is
+    started once for many calls.
+
+    .. code-block:: python
+
+        maps = [chop_list(list(binary_list(wells, 96)), 12)
+                for wells in layouts]
+        rects = max_rectangles(maps, value=1, processes=4)
+
+    Parameters
+    ----------
+    mats: list, numpy.ndarray
+        A list of 2D plate maps (sizes can differ) or a 3D array
+    value: int, optional
+        Value that user is looking for
+    processes: Int, optional
+        Number of worker processes of a pool started for this call. Only
+        used when there is more than one chunk of plate maps.
+    chunk_size: Int, optional
+        Number of plate maps analyzed per call (and per pool task)
+    executor: object, optional
+        A process pool or executor with a `map` method to analyze the
+        chunks with instead of starting a pool, e.g. a
+        `multiprocessing.Pool` reused across calls
+
+    Returns
+    -------
+    List
+        The maximum sized rectangle of each plate map, in input order
+
+    """
+    assert chunk_size > 0
+    # group plate maps of the same shape so each chunk is one 3D array
+    groups = {}
+    for i, mat in enumerate(mats):
+        shape = np.shape(mat) if np is not None else \
+            (len(mat), len(mat[0]) if len(mat) else 0)
+        groups.setdefault(shape, []).append(i)
+
+    chunks = []
+    for positions in groups.values():
+        for start in range(0, len(positions), chunk_size):
+            part = positions[start:start + chunk_size]
+            chunks.append((part, [mats[i] for i in part]))
+
+    tasks = [(chunk, value) for _, chunk in chunks]
+    if executor is not None:
+        results = list(executor.map(_max_rectangle_chunk, tasks))
+    elif processes and processes > 1 and len(chunks) > 1:
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(_max_rectangle_chunk, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_max_rectangle_chunk(task) for task in tasks]
+
+    rects = [None] * len(mats)
+    for (part, _), result in zip(chunks, results):
+        for i, rect in zip(part, result):
+            rects[i] = rect
+    return rects
+
+
 def binary_list(wells, length=None):
     """Turns a list of indices into a binary list with list at
     indices that appear in the initial list set to 1, and 0
@@ -163,14 +663,139 @@ def binary_list(wells, length=None):
             yield 0
 
 
-def get_quadrant_indices(quad):
+def _quadrant_tables(rows, cols, factor):
+    """Forward (quadrant -> plate indices) and inverse (plate index ->
+    (quadrant, position)) lookup tables for a plate that interleaves
+    factor x factor quadrants"""
+    quad_rows = rows // factor
+    quad_cols = cols // factor
+    forward = []
+    for quad in range(factor * factor):
+        row_offset, col_offset = divmod(quad, factor)
+        forward.append(tuple(
+            (row * factor + row_offset) * cols + col * factor + col_offset
+            for row in range(quad_rows) for col in range(quad_cols)))
+    inverse = [None] * (rows * cols)
+    for quad, wells in enumerate(forward):
+        for position, well in enumerate(wells):
+            inverse[well] = (quad, position)
+    return tuple(forward), tuple(inverse)
+
+
+# well_count: (rows, columns) of the SBS plate formats
+PLATE_LAYOUTS = {6: (2, 3), 24: (4, 6), 96: (8, 12), 384: (16, 24),
+                 1536: (32, 48)}
+# well_count: (rows, columns, interleave factor) of plates with quadrants.
+# A 384 well plate holds 4 and a 1536 well plate 16 quadrants of 96 wells.
+QUADRANT_LAYOUTS = dict(
+    (_well_count, (_rows, _cols, _rows // 8))
+    for _well_count, (_rows, _cols) in PLATE_LAYOUTS.items()
+    if _rows > 8 and _rows % 8 == 0 and _cols * 8 == _rows * 12)
+# well_count: tuple of the plate indices in each quadrant
+QUADRANT_INDICES = {}
+# well_count: tuple of (quadrant, position in quadrant) for each plate index
+QUADRANT_POSITIONS = {}
+for _well_count, _layout in QUADRANT_LAYOUTS.items():
+    QUADRANT_INDICES[_well_count], QUADRANT_POSITIONS[_well_count] = \
+        _quadrant_tables(*_layout)
+del _well_count, _layout
+
+_QUADRANT_ARRAYS = {}
+
+
+def _quadrant_arrays(well_count):
+    """QUADRANT_INDICES and QUADRANT_POSITIONS as NumPy arrays"""
+    if well_count not in _QUADRANT_ARRAYS:
+        _QUADRANT_ARRAYS[well_count] = (
+            np.array(QUADRANT_INDICES[well_count]),
+            np.array(QUADRANT_POSITIONS[well_count]).T)
+    return _QUADRANT_ARRAYS[well_count]
+
+
+def quadrant_to_plate(quadwells, quad, well_count=384):
+    """Map positions within a quadrant to well indices of the plate.
+
+    .. code-block:: none
+
+        quadrant_to_plate([0, 1, 12], 3)
+        [25, 27, 73]
+
+    Parameters
+    ----------
+    quadwells: Int, list, numpy.ndarray
+        Position(s) within the quadrant (rowwise, 0-95)
+    quad: Int
+        The quadrant
+    well_count: Int, optional
+        384 (quadrants 0-3) or 1536 (quadrants 0-15)
+
+    Returns
+    -------
+    Int, list, numpy.ndarray
+        The plate well index (or indices, same type as quadwells)
+
+    Raises
+    ------
+    ValueError
+        If quad is not a quadrant of the plate
+
+    """
+    assert well_count in QUADRANT_INDICES
+    tables = QUADRANT_INDICES[well_count]
+    if quad not in range(len(tables)):
+        raise ValueError("quad has to be 0-%s on a %s well plate, not %r" %
+                         (len(tables) - 1, well_count, quad))
+    table = tables[quad]
+    if np is not None and isinstance(quadwells, np.ndarray):
+        return _quadrant_arrays(well_count)[0][quad][quadwells]
+    if isinstance(quadwells, (list, tuple)):
+        return [table[i] for i in quadwells]
+    return table[quadwells]
+
+
+def plate_to_quadrant(wells, well_count=384):
+    """Map well indices of a plate to their quadrant and position within the
+    quadrant.
+
+    .. code-block:: none
+
+        plate_to_quadrant([25, 27, 73])
+        ([3, 3, 3], [0, 1, 12])
+
+    Parameters
+    ----------
+    wells: Int, list, numpy.ndarray
+        Plate well index (or indices)
+    well_count: Int, optional
+        384 or 1536
+
+    Returns
+    -------
+    tuple
+        (quadrant, position) for a single index OR
+        (quadrants, positions), of the same type as wells
+
+    """
+    assert well_count in QUADRANT_POSITIONS
+    table = QUADRANT_POSITIONS[well_count]
+    if np is not None and isinstance(wells, np.ndarray):
+        quads, positions = _quadrant_arrays(well_count)[1]
+        return quads[wells], positions[wells]
+    if isinstance(wells, (list, tuple)):
+        return ([table[i][0] for i in wells], [table[i][1] for i in wells])
+    return table[wells]
+
+
+def get_quadrant_indices(quad, well_count=384):
     """Return a list of well indices that correspond to the correct quadrant
-    on a 384 well plate
+    on a 384 (or 1536) well plate
 
     Parameters
     ----------
     quad: Int
-        The wells that need to be changed into a binary list
+        The quadrant, 0-3 on a 384 and 0-15 on a 1536 well plate
+    well_count: Int, optional
+        384 or 1536
 
     Returns
     -------
@@ -178,27 +803,24 @@ def get_quadrant_indices(quad):
         All the wells inside the desired quadrant
 
     """
-    assert quad in [0, 1, 2, 3]
-    start_well = [0, 1, 24, 25]
-    wells = []
-    for row_offset in xrange(start_well[quad], 384, 48):
-        for col_offset in xrange(0, 24, 2):
-            wells.append(row_offset + col_offset)
-
-    return wells
+    assert well_count in QUADRANT_INDICES
+    assert quad in range(len(QUADRANT_INDICES[well_count]))
+    return list(QUADRANT_INDICES[well_count][quad])
 
 
-def get_quadrant_binary_list(binary_list, quad=[0, 1, 2, 3]):
-    """Take a binary list of 384 elements (aka wells) and return all the wells in the designated quadrant.
+def get_quadrant_binary_list(binary_list, quad=None):
+    """Take a binary list of 384 (or 1536) elements (aka wells) and return all
+    the wells in the designated quadrant.
     This will be the stampable 96 wells that we have to check for a rectangle.
 
     Parameters
     ----------
     binary_list: List
-        The 384 element well plate
+        The 384 or 1536 element well plate
 
-    quad: list
-        The quadrants to look in, the values can be: 0,1,2,3
+    quad: list, optional
+        The quadrants to look in, the values can be: 0,1,2,3 (0-15 on a 1536
+        well plate). Defaults to all quadrants.
 
     Returns
     -------
@@ -206,20 +828,23 @@ def get_quadrant_binary_list(binary_list, quad=[0, 1, 2, 3]):
         A list filled with smaller lists, separating each set of wells into quadrants
 
     """
-    assert len(binary_list) == 384
+    assert len(binary_list) in QUADRANT_INDICES
+    tables = QUADRANT_INDICES[len(binary_list)]
+    if quad is None:
+        quad = range(len(tables))
     for q in quad:
-        assert q in [0, 1, 2, 3]
+        assert q in range(len(tables))
 
     wells = []
     for q in quad:
-        wells.append([binary_list[i] for i in get_quadrant_indices(q)])
+        wells.append([binary_list[i] for i in tables[q]])
 
     return wells
 
 
-def get_well_in_quadrant(quadwells, quad):
+def get_well_in_quadrant(quadwells, quad, well_count=384):
     """Take a list of wells and quadrant and return the correct well index in the 384
-    plate
+    (or 1536) plate
 
     Parameters
     ----------
@@ -227,6 +852,8 @@ def get_well_in_quadrant(quadwells, quad):
         The wells in question
     quad: Int
         The quadrant the well is in
+    well_count: Int, optional
+        384 or 1536
 
     Returns
     -------
@@ -235,12 +862,10 @@ def get_well_in_quadrant(quadwells, quad):
 
     """
     assert isinstance(quadwells, list)
-    assert quad in [0, 1, 2, 3]
+    assert well_count in QUADRANT_INDICES
+    assert quad in range(len(QUADRANT_INDICES[well_count]))
 
-    basewells = get_quadrant_indices(quad)
-    wells = [basewells[i] for i in quadwells]
-
-    return wells
+    return quadrant_to_plate(quadwells, quad, well_count)
 
 
 def chop_list(lst, chop_length, filler=None):
@@ -1,4 +1,5 @@
 from autoprotocol.unit import Unit
+from unit_helpers import parse_quantity, to_celsius, to_seconds
 import sys
 
 if sys.version_info[0] >= 3:
@@ -109,32 +110,24 @@ def thermocycle_ramp(start_temp, end_temp, total_duration, step_duration):
     assert isinstance(total_duration, (string_type, Unit))
     assert isinstance(step_duration, (string_type, Unit))
 
-    if isinstance(start_temp, string_type):
-        start_temp = Unit.fromstring(start_temp)
-    elif isinstance(start_temp, (int, float)):
-        start_temp = Unit(start_temp, 'degC')
-    if isinstance(end_temp, string_type):
-        end_temp = Unit.fromstring(end_temp)
-    elif isinstance(end_temp, (int, float)):
-        end_temp = Unit(end_temp, 'degC')
-    if isinstance(total_duration, string_type):
-        total_duration = Unit.fromstring(total_duration)
-    if isinstance(step_duration, string_type):
-        step_duration = Unit.fromstring(step_duration)
-
-    start_temp.ito('degC')
-    end_temp.ito('degC')
-    total_duration.ito_base_units()
-    step_duration.ito_base_units()
-
-    num_steps = int(total_duration // step_duration)
-    step_size = (end_temp - start_temp).magnitude // num_steps
+    start_temp = to_celsius(start_temp)
+    end_temp = to_celsius(end_temp)
+    total_duration = to_seconds(total_duration)
+    step_seconds = to_seconds(step_duration)
 
+    num_steps = int(total_duration // step_seconds)
+    step_size = (end_temp - start_temp) // num_steps
+
+    # Deliberately byte-identical to the output before the float path: the
+    # magnitude is in seconds but keeps the unit name it was given in, so
+    # "1:minute" becomes "60.0:minute" (str() of a Unit converted in place
+    # with ito_base_units). Pinned by test_thermocycle_ramp_duration_string.
+    duration = ":".join([str(step_seconds), "^".join(
+        parse_quantity(step_duration).name.split("**"))]).replace(" ", "")
     thermocycle_steps = []
     for i in range(num_steps + 1):
         thermocycle_steps.append({
-            "temperature": "%s:celsius" % (
-                start_temp.magnitude + i * step_size),
-            "duration": str(step_duration)
+            "temperature": "%s:celsius" % (start_temp + i * step_size),
+            "duration": duration
         })
     return thermocycle_steps
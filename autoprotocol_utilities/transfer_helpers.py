@@ -0,0 +1,233 @@
+from autoprotocol.container import Well, WellGroup
+from rectangle import row_masks, decompose_rectangles, QUADRANT_POSITIONS
+from collections import namedtuple, OrderedDict
+
+# One liquid handling operation of a transfer plan, see plan_transfers
+TransferStep = namedtuple('TransferStep', 'kind source destination shape '
+                          'pairs')
+
+# rows and columns of a 96 channel head
+HEAD_ROWS = 8
+HEAD_COLS = 12
+
+
+def head_position(well):
+    """Position of a well under a 96 channel head
+
+    A 96 well plate is one grid of the head, a 384 or 1536 well plate is
+    addressed in quadrants of 96 wells.
+
+    Parameters
+    ----------
+    well : Well
+
+    Returns
+    -------
+    tuple
+        (quadrant or None, row, column) of the well on the grid of the
+        head OR
+    None
+        If the container can not be stamped
+
+    """
+    container_type = well.container.container_type
+    well_count = container_type.well_count
+    if well_count == HEAD_ROWS * HEAD_COLS and \
+            container_type.col_count == HEAD_COLS:
+        return (None,) + divmod(well.index, HEAD_COLS)
+    if well_count in QUADRANT_POSITIONS:
+        quad, position = QUADRANT_POSITIONS[well_count][well.index]
+        return (quad,) + divmod(position, HEAD_COLS)
+    return None
+
+
+def _well_list(wells, name):
+    if isinstance(wells, Well):
+        return [wells]
+    assert isinstance(wells, (list, WellGroup)), "plan_transfers: %s has " \
+        "to be a Well, a list or a WellGroup" % name
+    for well in wells:
+        assert isinstance(well, Well), "plan_transfers: elements of %s " \
+            "have to be of type Well" % name
+    return list(wells)
+
+
+def _row_step(well, channels):
+    """Rows between the wells under neighbouring tips of a multichannel
+    pipette, 2 on a 384 well plate for 8 channels"""
+    container_type = well.container.container_type
+    rows = container_type.well_count // container_type.col_count
+    return max(1, rows // channels)
+
+
+def _plan_stamps(pairs, done, channels):
+    """Stamps of rectangles of at least channels + 1 pairs that are moved
+    by the same offset between the same head grids"""
+    # (source grid, destination grid, offset): {position: pair index}
+    groups = OrderedDict()
+    for i, (src, dest) in enumerate(pairs):
+        src_pos = head_position(src)
+        dest_pos = head_position(dest)
+        if src_pos is None or dest_pos is None:
+            continue
+        key = (src.container, src_pos[0], dest.container, dest_pos[0],
+               dest_pos[1] - src_pos[1], dest_pos[2] - src_pos[2])
+        # a pair repeated at the same position is left for later steps
+        groups.setdefault(key, {}).setdefault(
+            src_pos[1] * HEAD_COLS + src_pos[2], i)
+    steps = []
+    for positions in groups.values():
+        if len(positions) <= channels:
+            continue
+        masks = row_masks(list(positions), HEAD_COLS, HEAD_ROWS)
+        for r in decompose_rectangles(masks, HEAD_COLS, channels + 1,
+                                      full=True):
+            covered = [positions[(r.y + y) * HEAD_COLS + r.x + x]
+                       for y in range(r.height) for x in range(r.width)]
+            for i in covered:
+                done[i] = True
+            steps.append(TransferStep(
+                kind="stamp", source=pairs[covered[0]][0],
+                destination=pairs[covered[0]][1],
+                shape=dict(rows=r.height, columns=r.width),
+                pairs=[pairs[i] for i in covered]))
+    return steps
+
+
+def _plan_columns(pairs, done, channels):
+    """Multichannel transfers of runs of `channels` pairs down one source
+    and one destination column, one pair per tip"""
+    # (source column, destination column, lane offset): {lane: pair index}
+    groups = OrderedDict()
+    for i, (src, dest) in enumerate(pairs):
+        if done[i]:
+            continue
+        src_step = _row_step(src, channels)
+        dest_step = _row_step(dest, channels)
+        src_row, src_col = divmod(src.index,
+                                  src.container.container_type.col_count)
+        dest_row, dest_col = divmod(dest.index,
+                                    dest.container.container_type.col_count)
+        key = (src.container, src_col, src_row % src_step, dest.container,
+               dest_col, dest_row % dest_step,
+               dest_row // dest_step - src_row // src_step)
+        groups.setdefault(key, {}).setdefault(src_row // src_step, i)
+    steps = []
+
+    def add(run):
+        # shorter runs would leave tips empty, they are single transfers
+        if len(run) < channels:
+            return
+        for i in run:
+            done[i] = True
+        steps.append(TransferStep(
+            kind="column", source=pairs[run[0]][0],
+            destination=pairs[run[0]][1],
+            shape=dict(rows=len(run), columns=1),
+            pairs=[pairs[i] for i in run]))
+
+    for lanes in groups.values():
+        run = []
+        previous = None
+        for lane in sorted(lanes):
+            if run and (lane != previous + 1 or len(run) == channels):
+                add(run)
+                run = []
+            run.append(lanes[lane])
+            previous = lane
+        add(run)
+    return steps
+
+
+def plan_transfers(source, destination, stamp=True, columns=True,
+                   channels=8):
+    """Group paired source and destination wells into few liquid handling
+    operations
+
+    Pairs that are moved by the same offset between two plates a 96 channel
+    head can address are stamped, as long as the stamp spans full rows or
+    full columns of the head and moves more wells than one multichannel
+    transfer could. Of the remaining pairs, every run of `channels` pairs
+    down one source and one destination column is a column step: one
+    aspirate and one dispense of a multichannel pipette, a tip in every
+    row (every other row of a 384 well plate for 8 channels). All other
+    pairs are moved one by one. The plan is built greedily, so it has few
+    but not necessarily the fewest operations.
+
+    With the default 8 channels on 96 and 384 well plates a column step is
+    a stamp of one column of the 96 channel head, so stamp and column steps
+    can both be carried out with `Protocol.stamp`.
+
+    The plan changes the order of the transfers. Do not use it if the order
+    matters, e.g. when a well is both a source and a destination.
+
+    .. code-block:: python
+
+        plan = plan_transfers(src_plate.wells_from(0, 48),
+                              dest_plate.wells_from(0, 48))
+        for step in plan:
+            if step.kind == "single":
+                p.transfer(step.source, step.destination, "10:microliter")
+            else:
+                p.stamp(step.source, step.destination, "10:microliter",
+                        step.shape)
+
+    Parameters
+    ----------
+    source : Well, list, WellGroup
+        Source wells
+    destination : Well, list, WellGroup
+        Destination wells, one for every source well
+    stamp : bool, optional
+        Plan stamps
+    columns : bool, optional
+        Plan multichannel column transfers
+    channels : int, optional
+        Number of channels of the multichannel pipette, the number of pairs
+        of every column step
+
+    Returns
+    -------
+    list
+        TransferStep namedtuples: the stamps, then the column transfers,
+        then the single transfers
+
+    kind: str
+        "stamp", "column" (`channels` pairs in one multichannel transfer)
+        or "single"
+    source: Well
+        The first source well, the top left one of a stamp
+    destination: Well
+        The first destination well
+    shape: dict
+        `rows` and `columns` moved by the step, the shape of a stamp
+    pairs: list
+        (source, destination) tuples of the wells moved by the step
+
+    Raises
+    ------
+    ValueError
+        If source or destination are not of type Well, list or WellGroup
+    ValueError
+        If elements of source or destination are not of type Well
+    ValueError
+        If source and destination are not of the same length
+
+    """
+    source = _well_list(source, "source")
+    destination = _well_list(destination, "destination")
+    assert len(source) == len(destination), "plan_transfers: source and " \
+        "destination have to be of the same length"
+    assert channels >= 1, "plan_transfers: channels has to be at least 1"
+    pairs = list(zip(source, destination))
+    done = [False] * len(pairs)
+    plan = []
+    if stamp:
+        plan.extend(_plan_stamps(pairs, done, channels))
+    if columns and channels > 1:
+        plan.extend(_plan_columns(pairs, done, channels))
+    plan.extend(TransferStep(kind="single", source=src, destination=dest,
+                             shape=dict(rows=1, columns=1),
+                             pairs=[(src, dest)])
+                for (src, dest), moved in zip(pairs, done) if not moved)
+    return plan
@@ -0,0 +1,199 @@
+from autoprotocol.unit import Unit
+from collections import namedtuple
+from misc_helpers import LRUCache
+import sys
+
+if sys.version_info[0] >= 3:
+    string_type = str
+else:
+    string_type = basestring
+
+
+# A parsed Unit: float magnitude, pint units and the autoprotocol unit name
+Quantity = namedtuple('Quantity', 'magnitude units name')
+
+# "value:unit" string: its Quantity, see parse_cache_info
+_PARSED = LRUCache(maxsize=1024)
+
+# (pint units, target unit or None for SI base units): factor to multiply a
+# magnitude with
+_FACTORS = {}
+
+_CELSIUS = Unit(0, "celsius")._units
+
+
+def parse_quantity(value):
+    """Magnitude and units of a Unit or a "value:unit" string
+
+    Strings are parsed by `Unit.fromstring` and kept in a least recently
+    used cache of parsed strings shared by all helpers, see
+    `parse_cache_info`.
+
+    Parameters
+    ----------
+    value : Unit, str
+        Unit or string in the format of "value:unit"
+
+    Returns
+    -------
+    Quantity
+        namedtuple of the `magnitude` (float), the pint `units` and the
+        autoprotocol unit `name`
+
+    Raises
+    ------
+    ValueError
+        If value is not of type Unit or string
+
+    """
+    if isinstance(value, Unit):
+        return Quantity(value.magnitude, value._units, value.unit)
+    assert isinstance(value, string_type), "%s is not a Unit or string" % (
+        value,)
+    quantity = _PARSED.get(value)
+    if quantity is None:
+        unit = Unit.fromstring(value)
+        quantity = Quantity(unit.magnitude, unit._units, unit.unit)
+        _PARSED[value] = quantity
+    return quantity
+
+
+def to_unit(value):
+    """New Unit of a Unit or "value:unit" string
+
+    Like `Unit.fromstring`, but strings are parsed through the cache of
+    `parse_quantity`. The returned Unit is never shared, so it can be
+    changed in place.
+
+    Parameters
+    ----------
+    value : Unit, str
+
+    Returns
+    -------
+    Unit
+
+    """
+    quantity = parse_quantity(value)
+    return Unit(quantity.magnitude, quantity.units)
+
+
+def parse_cache_info():
+    """Statistics of the cache of parsed "value:unit" strings
+
+    Returns
+    -------
+    CacheInfo
+        namedtuple of hits, misses, maxsize and currsize
+
+    """
+    return _PARSED.info()
+
+
+def set_parse_cache_size(maxsize):
+    """Change how many parsed "value:unit" strings are cached
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of cached strings
+
+    """
+    _PARSED.resize(maxsize)
+
+
+def clear_parse_cache():
+    """Empty the cache of parsed "value:unit" strings and reset its
+    statistics"""
+    _PARSED.clear()
+
+
+def _factor(units, target):
+    """Multiplicative factor converting a magnitude in units to target"""
+    factor = _FACTORS.get((units, target))
+    if factor is None:
+        if target is None:
+            factor = Unit(1, units).to_base_units().magnitude
+        else:
+            factor = Unit(1, units).to(target).magnitude
+        _FACTORS[(units, target)] = factor
+    return factor
+
+
+def _convert(value, target):
+    if isinstance(value, (int, float)):
+        return float(value)
+    quantity = parse_quantity(value)
+    return quantity.magnitude * _factor(quantity.units, target)
+
+
+def base_magnitude(value):
+    """Magnitude of a Unit or "value:unit" string in SI base units
+
+    Same as ``value.to_base_units().magnitude``.
+
+    Parameters
+    ----------
+    value : Unit, str
+
+    Returns
+    -------
+    float
+
+    """
+    quantity = parse_quantity(value)
+    return quantity.magnitude * _factor(quantity.units, None)
+
+
+def to_microliters(value):
+    """Volume in microliters
+
+    Parameters
+    ----------
+    value : Unit, str, int, float
+        Volume. If int or float is used, microliter will be assumed.
+
+    Returns
+    -------
+    float
+
+    """
+    return _convert(value, "microliter")
+
+
+def to_seconds(value):
+    """Duration in seconds
+
+    Parameters
+    ----------
+    value : Unit, str, int, float
+        Duration. If int or float is used, second will be assumed.
+
+    Returns
+    -------
+    float
+
+    """
+    return _convert(value, "second")
+
+
+def to_celsius(value):
+    """Temperature in degrees celsius
+
+    Parameters
+    ----------
+    value : Unit, str, int, float
+        Temperature. If int or float is used, celsius will be assumed.
+
+    Returns
+    -------
+    float
+
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    quantity = parse_quantity(value)
+    if quantity.units == _CELSIUS:
+        return quantity.magnitude
+    # offset units can not be converted with a factor
+    return Unit(quantity.magnitude, quantity.units).to("celsius").magnitude
@@ -0,0 +1,233 @@
+"""Grouping and sorting wells of many containers with get_well_list_by_cont,
+unique_containers and sort_well_group, and checking their volumes with
+volume_check and bulk_volume_check, correcting them with
+set_pipettable_volume, and finding the stamps of many plates with
+stamp_shapes.
+
+Run with ``python benchmarks/bench_containers.py``.
+"""
+from operator import itemgetter
+from random import Random
+from harness import Case, run
+from autoprotocol import Protocol
+from autoprotocol.container import Container, Well, WellGroup
+from autoprotocol.unit import Unit
+from autoprotocol_utilities.container_helpers import get_well_list_by_cont, \
+    unique_containers, sort_well_group, volume_check, bulk_volume_check, \
+    well_name, string_type, set_pipettable_volume, pipettable_volumes, \
+    list_of_filled_wells, stamp_shape, stamp_shapes, clear_layout_cache
+from autoprotocol_utilities.misc_helpers import flatten_list
+
+
+def legacy_get_well_list_by_cont(wells):
+    """get_well_list_by_cont before the single pass grouping"""
+    conts = list(set([well.container for well in flatten_list(list(wells))]))
+    well_map = {}
+    for cont in conts:
+        well_map[cont] = []
+        well_map[cont].extend(
+            [well for well in wells if well.container == cont])
+    return well_map
+
+
+def legacy_sort_well_group(wells, columnwise=False):
+    """sort_well_group before the precomputed integer keys"""
+    well_list = [(
+        well,
+        well.container.id,
+        well.container.name,
+        well.container.decompose(well)[0],
+        well.container.decompose(well)[1]
+        ) for well in wells
+    ]
+    if columnwise:
+        sorted_well_list = sorted(well_list, key=itemgetter(1, 2, 4, 3))
+    else:
+        sorted_well_list = sorted(well_list, key=itemgetter(1, 2, 3, 4))
+    return WellGroup([well[0] for well in sorted_well_list])
+
+
+def legacy_volume_check(well, usage_volume=0, use_safe_vol=False,
+                        use_safe_dead_diff=False):
+    """volume_check before the bulk check"""
+    assert isinstance(well, (Well, WellGroup, list))
+    if isinstance(well, Well):
+        well = [well]
+
+    error_message = []
+    # noinspection PyTypeChecker
+    for aliquot in well:
+        assert isinstance(aliquot, Well)
+        if isinstance(usage_volume, (int, float)):
+            usage_volume = Unit(usage_volume, "microliter")
+        if isinstance(usage_volume, string_type):
+            usage_volume = int(usage_volume.split(":microliter")[0])
+        if not aliquot.volume:
+            error_message.append(
+                "Your aliquot does not have a volume. (%s) We assume 0 uL "
+                "for this test." % aliquot)
+
+        correction_vol = aliquot.container.container_type.dead_volume_ul
+        message_string = "dead volume"
+        volume = Unit(0, "microliter")
+        if aliquot.volume:
+            volume = aliquot.volume
+        if use_safe_vol:
+            correction_vol = \
+                aliquot.container.container_type.safe_min_volume_ul
+            message_string = "safe minimum volume"
+        elif use_safe_dead_diff:
+            correction_vol = \
+                aliquot.container.container_type.safe_min_volume_ul - \
+                aliquot.container.container_type.dead_volume_ul
+            message_string = "safe minimum volume"
+            volume = volume + aliquot.container.container_type.dead_volume_ul
+        test_vol = correction_vol + usage_volume
+
+        if test_vol > volume:
+            if usage_volume == 0:
+                error_message.append(
+                    "You want to pipette from a container with {:~P} {!s}. "
+                    "However, your aliquot: {!s}, only has {:~P}.".format(
+                        correction_vol, message_string,
+                        well_name(aliquot), volume))
+            else:
+                error_message.append(
+                    "You want to pipette {:~P} from a container with {:~P} "
+                    "{!s} ({:~P} total). However, your aliquot: {!s}, only has"
+                    " {:~P}.".format(
+                        usage_volume, correction_vol, message_string,
+                        usage_volume + correction_vol,
+                        well_name(aliquot), volume))
+    if error_message:
+        error_message = str(len(error_message)) + " volume errors: " + \
+            ", ".join(error_message)
+    else:
+        error_message = None
+    return error_message
+
+
+def legacy_set_pipettable_volume(well, use_safe_vol=False):
+    """set_pipettable_volume before pipettable_volumes"""
+    cont = {}
+    if isinstance(well, (list, WellGroup)):
+        cont = get_well_list_by_cont(well)
+    elif isinstance(well, Container):
+        cont[well] = list_of_filled_wells(well)
+    elif isinstance(well, Well):
+        cont[well.container] = [well]
+
+    for c, w in cont.items():
+        correction_vol = c.container_type.dead_volume_ul
+        if use_safe_vol:
+            correction_vol = c.container_type.safe_min_volume_ul
+        for x in w:
+            x.set_volume(x.volume - correction_vol)
+
+    return well
+
+
+def pooled_wells(plates, wells_per_plate, cont_type="96-pcr"):
+    p = Protocol()
+    wells = []
+    for i in range(plates):
+        cont = p.ref("plate_%s" % i, id=None, cont_type=cont_type,
+                     discard=True)
+        wells.extend(cont.wells_from(0, wells_per_plate))
+    return wells
+
+
+def cases():
+    cases = []
+    for plates, per_plate in [(10, 96), (200, 96), (60, 384)]:
+        cont_type = "96-pcr" if per_plate == 96 else "384-flat"
+        wells = pooled_wells(plates, per_plate, cont_type)
+        label = "%s plates x %s wells" % (plates, per_plate)
+        cases.extend([
+            Case("get_well_list_by_cont (legacy), " + label,
+                 lambda wells=wells: legacy_get_well_list_by_cont(wells),
+                 len(wells)),
+            Case("get_well_list_by_cont, " + label,
+                 lambda wells=wells: get_well_list_by_cont(wells),
+                 len(wells)),
+            Case("get_well_list_by_cont ordered, " + label,
+                 lambda wells=wells: get_well_list_by_cont(wells, True),
+                 len(wells)),
+            Case("unique_containers, " + label,
+                 lambda wells=wells: unique_containers(wells), len(wells)),
+        ])
+    wells = pooled_wells(130, 384, "384-flat")
+    Random(0).shuffle(wells)
+    label = "130 plates x 384 wells, shuffled"
+    for columnwise in (False, True):
+        name = "columnwise" if columnwise else "rowwise"
+        cases.extend([
+            Case("sort_well_group %s (legacy), %s" % (name, label),
+                 lambda c=columnwise: legacy_sort_well_group(wells, c),
+                 len(wells)),
+            Case("sort_well_group %s, %s" % (name, label),
+                 lambda c=columnwise: sort_well_group(wells, c), len(wells)),
+        ])
+    wells = pooled_wells(20, 384, "384-echo")
+    rng = Random(1)
+    for well in wells:
+        well.set_volume("%s:microliter" % rng.choice([5, 20, 40, 60]))
+    label = "20 plates x 384 wells"
+    cases.extend([
+        Case("volume_check (legacy), " + label,
+             lambda: legacy_volume_check(wells, 10), len(wells)),
+        Case("volume_check, " + label,
+             lambda: volume_check(wells, 10), len(wells)),
+        Case("volume_check structured, " + label,
+             lambda: volume_check(wells, 10, structured=True), len(wells)),
+        Case("bulk_volume_check, " + label,
+             lambda: bulk_volume_check(wells, 10), len(wells)),
+        Case("bulk_volume_check with messages, " + label,
+             lambda: bulk_volume_check(wells, 10).error_messages(),
+             len(wells)),
+    ])
+
+    def refill(wells):
+        for well in wells:
+            well.volume = Unit(50, "microliter")
+        return wells
+
+    cases.extend([
+        Case("set_pipettable_volume (legacy), " + label,
+             lambda: legacy_set_pipettable_volume(refill(wells)), len(wells)),
+        Case("set_pipettable_volume, " + label,
+             lambda: set_pipettable_volume(refill(wells)), len(wells)),
+        Case("pipettable_volumes, " + label,
+             lambda: pipettable_volumes(wells), len(wells)),
+        Case("refill only, " + label, lambda: refill(wells), len(wells)),
+    ])
+
+    # random partial layouts, so every plate has its own stamps
+    rng = Random(2)
+    stamp_wells = []
+    for well in pooled_wells(100, 384, "384-echo"):
+        if rng.random() < 0.6:
+            stamp_wells.append(well)
+    rng.shuffle(stamp_wells)
+    label = "100 plates x 384 wells"
+
+    def per_container():
+        return [stamp_shape(group, multi=True) for group in
+                get_well_list_by_cont(stamp_wells, ordered=True).values()]
+
+    def uncached():
+        clear_layout_cache()
+        return stamp_shapes(stamp_wells, multi=True)
+
+    cases.extend([
+        Case("stamp_shape per container, " + label, per_container,
+             len(stamp_wells)),
+        Case("stamp_shapes, " + label,
+             lambda: stamp_shapes(stamp_wells, multi=True), len(stamp_wells)),
+        Case("stamp_shapes uncached, " + label, uncached, len(stamp_wells)),
+    ])
+    return cases
+
+
+if __name__ == "__main__":
+    run(cases(), repeat=3)
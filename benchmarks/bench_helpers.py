@@ -0,0 +1,204 @@
+"""Call latency of the public helpers on realistic plates: 96, 384 and 1536
+well plates, partially filled, and inputs spanning many plates.
+
+Run with ``python benchmarks/bench_helpers.py`` or through ``run.py`` to
+compare against the stored baselines.
+"""
+from random import Random
+from harness import Case, run
+from autoprotocol import Protocol
+from autoprotocol.container import Container, Well, WellGroup
+from autoprotocol.container_type import ContainerType
+from autoprotocol.unit import Unit
+from autoprotocol_utilities.container_helpers import stamp_shape, \
+    is_columnwise, sort_well_group, volume_check, get_well_list_by_cont, \
+    unique_containers, well_layout, clear_layout_cache
+from autoprotocol_utilities.misc_helpers import flatten_list, \
+    recursive_search
+from autoprotocol_utilities.rectangle import max_rectangle
+from autoprotocol_utilities.thermocycle_helpers import thermocycle_ramp
+
+# autoprotocol does not ship a 1536 well container type
+PLATE_1536 = ContainerType(name="1536-well plate", is_tube=False,
+                           well_count=1536, well_depth_mm=None,
+                           well_volume_ul=Unit(12, "microliter"),
+                           well_coating=None, sterile=False, capabilities=[],
+                           shortname="1536-bench", col_count=48,
+                           dead_volume_ul=Unit(2, "microliter"),
+                           safe_min_volume_ul=Unit(4, "microliter"))
+
+# well count, container type, volume to fill wells with
+CONTAINER_TYPES = [(96, "96-pcr", "10:microliter"),
+                   (384, "384-echo", "30:microliter"),
+                   (1536, PLATE_1536, "10:microliter")]
+
+
+def legacy_is_columnwise(wells):
+    """is_columnwise before well_layout"""
+    em = []
+    colwise = False
+    if isinstance(wells, Well):
+        colwise = False
+    else:
+        assert isinstance(wells, (list, WellGroup)), "is_columnwise: wells"
+        " has to be a list or a WellGroup"
+        for well in wells:
+            assert isinstance(well, (Well)), "is_columnwise: elements of "
+            "wells have to be of type Well"
+        if len(unique_containers(wells)) != 1:
+            em.append("is_columnwise: wells have to come from one container")
+
+    cont = unique_containers(wells)[0]
+
+    all_wells = list(cont.all_wells(columnwise=True))
+    top_wells = list(cont.wells_from(0, cont.container_type.col_count))
+    wells = sort_well_group(wells, columnwise=True)
+
+    if wells[0] in top_wells:
+        top_well = top_wells[top_wells.index(wells[0])]
+        start = all_wells.index(top_well)
+        for x in range(len(wells)):
+            if wells[x] == all_wells[start]:
+                colwise = True
+                start += 1
+            else:
+                colwise = False
+                break
+    else:
+        colwise = False
+
+    em = filter(None, em)
+    if len(em) > 0:
+        return em
+    else:
+        return colwise
+
+
+def uncached(func, *args, **kwargs):
+    """Call a layout helper without the layout cache"""
+    clear_layout_cache()
+    return func(*args, **kwargs)
+
+
+def make_plate(protocol, name, cont_type):
+    if isinstance(cont_type, ContainerType):
+        return Container(None, cont_type, name=name)
+    return protocol.ref(name, id=None, cont_type=cont_type, discard=True)
+
+
+def fill(plate, fraction, rnd, volume="10:microliter"):
+    """Fill a block of `fraction` of the columns and some scattered wells"""
+    cols = plate.container_type.col_count
+    rows = plate.container_type.well_count // cols
+    filled = []
+    for col in range(max(1, int(cols * fraction))):
+        filled.extend(plate.well(row * cols + col) for row in range(rows))
+    filled.extend(plate.well(rnd.randrange(plate.container_type.well_count))
+                  for i in range(rows))
+    for well in filled:
+        well.set_volume(volume)
+    return filled
+
+
+def nested_params(wells, depth=4, width=4):
+    """Protocol parameters like the ones of a launch: nested dicts and
+    lists with wells, strings and numbers as leaves"""
+    wells = iter(wells)
+
+    def level(d):
+        if d == 0:
+            return [next(wells, "no well"), "text", 1.5]
+        return {"group_%s" % i: [level(d - 1), {"n": i}]
+                for i in range(width)}
+    return level(depth)
+
+
+def cases():
+    rnd = Random(0)
+    p = Protocol()
+    cases = []
+    for well_count, cont_type, volume in CONTAINER_TYPES:
+        plate = make_plate(p, "bench_%s" % well_count, cont_type)
+        wells = fill(plate, 0.5, rnd, volume)
+        shuffled = list(wells)
+        rnd.shuffle(shuffled)
+        columns = plate.all_wells()[:well_count // 4]
+        rows = plate.container_type.well_count // \
+            plate.container_type.col_count
+        binary = [[int(rnd.random() < 0.7)
+                   for x in range(plate.container_type.col_count)]
+                  for y in range(rows)]
+        label = "%s wells" % well_count
+        cases.extend([
+            Case("stamp_shape, " + label,
+                 lambda w=wells: stamp_shape(w), len(wells)),
+            Case("stamp_shape full=False, " + label,
+                 lambda w=wells: stamp_shape(w, full=False), len(wells)),
+            Case("stamp_shape full=False uncached, " + label,
+                 lambda w=wells: uncached(stamp_shape, w, full=False),
+                 len(wells)),
+            Case("is_columnwise (legacy), " + label,
+                 lambda w=columns: legacy_is_columnwise(w), len(columns)),
+            Case("is_columnwise, " + label,
+                 lambda w=columns: is_columnwise(w), len(columns)),
+            Case("well_layout, " + label,
+                 lambda w=wells: well_layout(w), len(wells)),
+            Case("well_layout uncached, " + label,
+                 lambda w=wells: uncached(well_layout, w), len(wells)),
+            Case("sort_well_group, " + label,
+                 lambda w=shuffled: sort_well_group(w), len(shuffled)),
+            Case("sort_well_group columnwise, " + label,
+                 lambda w=shuffled: sort_well_group(w, True), len(shuffled)),
+            Case("volume_check, " + label,
+                 lambda w=wells: volume_check(w, 5), len(wells)),
+            Case("max_rectangle, " + label,
+                 lambda b=binary: max_rectangle(b, 1), 1),
+        ])
+    for well_count, cont_type in [(384, "384-echo"), (1536, PLATE_1536)]:
+        quad_wells = make_plate(p, "bench_quad_%s" % well_count,
+                                cont_type).all_wells()
+        cases.extend([
+            Case("stamp_shape quad, %s wells" % well_count,
+                 lambda w=quad_wells: stamp_shape(w, quad=True), well_count),
+            Case("stamp_shape quad uncached, %s wells" % well_count,
+                 lambda w=quad_wells: uncached(stamp_shape, w, quad=True),
+                 well_count)])
+
+    plates = [make_plate(p, "bench_multi_%s" % i, "96-pcr")
+              for i in range(50)]
+    wells = []
+    for plate in plates:
+        wells.extend(fill(plate, 0.5, rnd))
+    rnd.shuffle(wells)
+    label = "50 x 96 wells"
+    cases.extend([
+        Case("get_well_list_by_cont, " + label,
+             lambda: get_well_list_by_cont(wells), len(wells)),
+        Case("sort_well_group, " + label,
+             lambda: sort_well_group(wells), len(wells)),
+        Case("volume_check, " + label,
+             lambda: volume_check(wells, 5), len(wells)),
+    ])
+
+    nested = [[wells[i:i + 8], [wells[i + 8:i + 12]]]
+              for i in range(0, len(wells), 12)]
+    params = nested_params(wells)
+    cases.extend([
+        Case("flatten_list, %s nested wells" % len(wells),
+             lambda: flatten_list(nested), len(wells)),
+        Case("recursive_search wells, 4 levels",
+             lambda: recursive_search(params, Well), 1),
+        Case("recursive_search with volume_check, 4 levels",
+             lambda: recursive_search(params, Well, volume_check,
+                                      {"usage_volume": 5}), 1),
+        Case("thermocycle_ramp, 30 steps",
+             lambda: thermocycle_ramp("95:celsius", "65:celsius",
+                                      "30:minute", "1:minute"), 30),
+        Case("thermocycle_ramp, 600 steps",
+             lambda: thermocycle_ramp(65, 95, "10:hour", "1:minute"), 600),
+    ])
+    return cases
+
+
+if __name__ == "__main__":
+    run(cases(), repeat=5)
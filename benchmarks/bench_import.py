@@ -0,0 +1,40 @@
+"""Cold start of the package: importing it and using the first helper, each
+in a new interpreter. Run directly to also print how much the import adds to
+the interpreter start.
+
+Run with ``python benchmarks/bench_import.py``.
+"""
+import os
+import subprocess
+import sys
+from harness import Case, run
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+
+def python(code):
+    return lambda: subprocess.check_call([sys.executable, "-c", code],
+                                         cwd=ROOT)
+
+
+def cases():
+    return [
+        Case("interpreter start", python("pass"), 1),
+        Case("import autoprotocol_utilities",
+             python("import autoprotocol_utilities"), 1),
+        Case("import autoprotocol_utilities, use flatten_list",
+             python("import autoprotocol_utilities as a; "
+                    "a.flatten_list([[1], [2]])"), 1),
+        Case("import autoprotocol_utilities, use volume_check",
+             python("import autoprotocol_utilities as a; a.volume_check"), 1),
+        Case("import autoprotocol", python("import autoprotocol"), 1),
+    ]
+
+
+if __name__ == "__main__":
+    timings = run(cases(), repeat=5)
+    # the helpers were imported eagerly before, now a cold import should
+    # cost about as much as starting the interpreter
+    print("import overhead over interpreter start: %.3f s" % (
+        timings["import autoprotocol_utilities"] -
+        timings["interpreter start"]))
@@ -0,0 +1,166 @@
+"""Flattening nested parameters with flatten_list and iter_flatten, and
+searching them with recursive_search and iter_search, serially and with a
+thread pool, and with a compiled SearchPlan.
+
+Run with ``python benchmarks/bench_misc.py``.
+"""
+from harness import Case, run
+import time
+from autoprotocol import Protocol
+from autoprotocol.container import Well
+from autoprotocol_utilities.container_helpers import volume_check
+from autoprotocol_utilities.misc_helpers import flatten_list, iter_flatten, \
+    recursive_search, iter_search, compile_search
+
+
+def lookup_well(well):
+    """A validator that waits on something else, like an inventory
+    lookup, for 1 ms per well"""
+    time.sleep(0.001)
+
+
+def legacy_flatten_list(l):
+    """flatten_list before iter_flatten"""
+    if isinstance(l, list):
+        return [x for sublist in l for x in legacy_flatten_list(sublist)]
+    else:
+        return [l]
+
+
+def legacy_recursive_search(params, class_name=None, method=None, args={}):
+    """recursive_search before iter_search"""
+    all_fields = []
+
+    def find_all_fields(params):
+        if isinstance(params, dict):
+            for key, value in params.items():
+                all_fields.append(key)
+                find_all_fields(value)
+        elif isinstance(params, list) or isinstance(params, tuple):
+            for item in params:
+                find_all_fields(item)
+        else:
+            all_fields.append(params)
+
+    find_all_fields(params)
+
+    if class_name:
+        found_instances = []
+        for field in all_fields:
+            if isinstance(field, class_name):
+                found_instances.append(field)
+        if method:
+            method_msgs = []
+            if hasattr(method, '__call__'):
+                for found in found_instances:
+                    response = method(found, **args)
+                    if response is not None:
+                        method_msgs.append(response)
+            else:
+                raise Exception("Method called has no method __call__")
+            return method_msgs
+        else:
+            return found_instances
+    else:
+        return all_fields
+
+
+
+def launch_params(plates, per_plate):
+    """Launch parameters: a list of samples, each a dict of fields"""
+    samples = []
+    for plate in aliquot_params(plates, per_plate):
+        for well in plate:
+            samples.append({"source": well, "name": "sample %s" % well.index,
+                            "volume": "10:microliter",
+                            "options": {"replicates": 3, "tags": ["a", "b"]}})
+    return {"samples": samples, "dry_run": False}
+
+
+def aliquot_params(plates, per_plate):
+    """aliquot++ style input: a list of plates, each a list of wells"""
+    p = Protocol()
+    return [list(p.ref("plate_%s" % i, id=None, cont_type="384-flat",
+                       discard=True).wells_from(0, per_plate))
+            for i in range(plates)]
+
+
+def nested(depth, width, leaf=0):
+    if depth == 0:
+        return leaf
+    return [nested(depth - 1, width, leaf) for i in range(width)]
+
+
+def cases():
+    cases = []
+    inputs = [
+        ("100 plates x 384 wells", aliquot_params(100, 384)),
+        ("8 levels x 4 wide", nested(8, 4)),
+        ("flat 50000", list(range(50000))),
+    ]
+    for label, data in inputs:
+        items = len(flatten_list(data))
+        cases.extend([
+            Case("flatten_list (legacy), " + label,
+                 lambda data=data: legacy_flatten_list(data), items),
+            Case("flatten_list, " + label,
+                 lambda data=data: flatten_list(data), items),
+            Case("iter_flatten first item, " + label,
+                 lambda data=data: next(iter_flatten(data)), 1),
+        ])
+    params = launch_params(20, 384)
+    label = "20 plates x 384 samples"
+    items = len(params["samples"])
+    plan = compile_search(params, Well)
+    other = launch_params(20, 384)
+    cases.extend([
+        Case("recursive_search (legacy), " + label,
+             lambda: legacy_recursive_search(params, Well), items),
+        Case("recursive_search, " + label,
+             lambda: recursive_search(params, Well), items),
+        Case("iter_search first match, " + label,
+             lambda: next(iter_search(params, Well)), 1),
+        Case("iter_search limit=10, " + label,
+             lambda: list(iter_search(params, Well, limit=10)), 10),
+        Case("compile_search, " + label,
+             lambda: compile_search(params, Well), items),
+        Case("SearchPlan.search, " + label,
+             lambda: plan.search(other), items),
+    ])
+    # volume_check runs once per well, so a smaller input
+    small = launch_params(2, 384)
+    label = "2 plates x 384 samples"
+    items = len(small["samples"])
+    cases.extend([
+        Case("recursive_search with volume_check, " + label,
+             lambda: recursive_search(small, Well, volume_check,
+                                      {"usage_volume": 5}), items),
+        # volume_check holds the GIL, threads make it slower
+        Case("recursive_search with volume_check, 4 threads, " + label,
+             lambda: recursive_search(small, Well, volume_check,
+                                      {"usage_volume": 5}, executor="thread",
+                                      chunksize=64, processes=4), items),
+    ])
+    # a method that waits is where threads pay off
+    plate = launch_params(1, 96)
+    label = "1 plate x 96 samples"
+    items = len(plate["samples"])
+    cases.extend([
+        Case("recursive_search with 1 ms lookup, " + label,
+             lambda: recursive_search(plate, Well, lookup_well), items),
+        Case("recursive_search with 1 ms lookup, 8 threads, " + label,
+             lambda: recursive_search(plate, Well, lookup_well,
+                                      executor="thread", processes=8),
+             items),
+    ])
+    # legacy_flatten_list exceeds the recursion limit on this one
+    deep = nested(900, 1)
+    for i in range(3):
+        deep = nested(900, 1, deep)
+    cases.append(Case("flatten_list, 3600 levels",
+                      lambda: flatten_list(deep), 1))
+    return cases
+
+
+if __name__ == "__main__":
+    run(cases(), repeat=5)
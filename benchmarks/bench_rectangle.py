@@ -0,0 +1,44 @@
+"""Throughput of max_rectangles versus calling max_rectangle per plate.
+
+Run with ``python benchmarks/bench_rectangle.py``.
+"""
+from random import Random
+from harness import Case, run
+from autoprotocol_utilities.rectangle import max_rectangle, max_rectangles
+
+PLATES = {96: (8, 12), 384: (16, 24), 1536: (32, 48)}
+
+
+def plate_maps(count, rows, cols, seed=0):
+    rnd = Random(seed)
+    maps = []
+    for i in range(count):
+        fill = rnd.random()
+        maps.append([[int(rnd.random() < fill) for x in range(cols)]
+                     for y in range(rows)])
+    return maps
+
+
+def cases():
+    cases = []
+    for well_count, (rows, cols) in sorted(PLATES.items()):
+        maps = plate_maps(200, rows, cols, seed=well_count)
+        cases.extend([
+            Case("max_rectangle loop, 200 x %s" % well_count,
+                 lambda maps=maps: [max_rectangle(m, 1) for m in maps],
+                 len(maps)),
+            Case("max_rectangles, 200 x %s" % well_count,
+                 lambda maps=maps: max_rectangles(maps, 1), len(maps)),
+        ])
+    maps = plate_maps(2000, 16, 24, seed=1)
+    cases.extend([
+        Case("max_rectangles, 2000 x 384",
+             lambda: max_rectangles(maps, 1), len(maps)),
+        Case("max_rectangles, 2000 x 384, 4 processes",
+             lambda: max_rectangles(maps, 1, processes=4), len(maps)),
+    ])
+    return cases
+
+
+if __name__ == "__main__":
+    run(cases(), repeat=3)
@@ -0,0 +1,66 @@
+"""Planning transfers between random 96 and 384 well layouts with
+plan_transfers: full plates, shifted blocks, random subsets and scattered
+pairs. Run directly to also print the number of operations per layout.
+
+Run with ``python benchmarks/bench_transfer.py``.
+"""
+from random import Random
+from harness import Case, run
+from autoprotocol import Protocol
+from autoprotocol_utilities.rectangle import QUADRANT_INDICES
+from autoprotocol_utilities.transfer_helpers import plan_transfers
+
+
+def layouts(seed=0):
+    """(label, source wells, destination wells)"""
+    rnd = Random(seed)
+    p = Protocol()
+    plates = {}
+    for cont_type in ("96-pcr", "384-echo"):
+        plates[cont_type] = [p.ref("%s_%s" % (cont_type, i), None, cont_type,
+                                   discard=True) for i in range(2)]
+    result = []
+    for src_type, dest_type in [("96-pcr", "96-pcr"),
+                                ("384-echo", "384-echo"),
+                                ("96-pcr", "384-echo")]:
+        src, dest = plates[src_type][0], plates[dest_type][1]
+        n = src.container_type.well_count
+        if n == dest.container_type.well_count:
+            target = list(range(n))
+        else:
+            # 96 wells go to the second quadrant of the 384 well plate
+            target = QUADRANT_INDICES[384][1]
+        label = "%s to %s" % (n, dest.container_type.well_count)
+
+        def pairs(indices, shift=0):
+            return ([src.well(i) for i in indices],
+                    [dest.well(target[i + shift]) for i in indices])
+        result.append(("full plate, " + label,) + pairs(range(n)))
+        cols = src.container_type.col_count
+        shift = 2 * cols + 1
+        block = [i for i in range(n - shift) if i % cols < cols // 2]
+        result.append(("shifted block, " + label,) + pairs(block, shift))
+        subset = sorted(rnd.sample(range(n), n // 2))
+        result.append(("random half, " + label,) + pairs(subset))
+        dest_count = dest.container_type.well_count
+        result.append(("scattered, " + label,
+                       [src.well(rnd.randrange(n)) for i in range(n // 2)],
+                       [dest.well(rnd.randrange(dest_count))
+                        for i in range(n // 2)]))
+    return result
+
+
+def cases():
+    return [Case("plan_transfers, " + label,
+                 lambda s=src, d=dest: plan_transfers(s, d), len(src))
+            for label, src, dest in layouts()]
+
+
+if __name__ == "__main__":
+    for label, src, dest in layouts():
+        plan = plan_transfers(src, dest)
+        print("%-32s %4d pairs %4d operations (%d stamps, %d columns)" % (
+            label, len(src), len(plan),
+            sum(step.kind == "stamp" for step in plan),
+            sum(step.kind == "column" for step in plan)))
+    run(cases(), repeat=5)
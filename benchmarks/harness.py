@@ -0,0 +1,68 @@
+"""Small timing harness shared by the benchmark scripts.
+
+Every benchmark module defines ``cases()`` returning a list of
+``Case(name, func, items)`` tuples. ``func`` is called without arguments and
+``items`` is the number of things (plates, wells, ...) it processes, used to
+report throughput.
+"""
+from collections import namedtuple
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+Case = namedtuple('Case', 'name func items')
+
+
+def times(func, repeat=5, number=None, min_time=0.02):
+    """Sorted wall clock times of one call of `func` in seconds, one per
+    repetition
+
+    Without `number`, fast functions are called often enough per repetition
+    to take at least `min_time` seconds, so timer noise does not dominate.
+    """
+    if number is None:
+        number = 1
+        while True:
+            elapsed = timeit.timeit(func, number=number)
+            if elapsed >= min_time:
+                break
+            number *= max(2, min(10, int(min_time / max(elapsed, 1e-6))))
+    return sorted(t / number
+                  for t in timeit.repeat(func, repeat=repeat, number=number))
+
+
+def best_time(func, repeat=5, number=None, min_time=0.02):
+    """Best wall clock time of one call of `func` in seconds, see times"""
+    return times(func, repeat, number, min_time)[0]
+
+
+def noise(timings):
+    """Spread of sorted timings of one case relative to the best one, the
+    median over the best minus 1"""
+    return timings[len(timings) // 2] / timings[0] - 1
+
+
+def calibrate(repeat=5):
+    """Seconds of a fixed pure Python workload, used to compare timings
+    taken on different machines"""
+    def workload():
+        total = 0
+        for i in range(200000):
+            total += i % 7
+        return total
+    return best_time(workload, repeat=repeat)
+
+
+def run(cases, repeat=5):
+    """Time all cases and print one line per case. Returns a dict of case
+    name to seconds per call."""
+    timings = {}
+    for case in cases:
+        seconds = best_time(case.func, repeat=repeat)
+        timings[case.name] = seconds
+        print("%-50s %10.3f ms %12.0f items/s" % (
+            case.name, seconds * 1000, case.items / seconds))
+    return timings
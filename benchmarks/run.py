@@ -0,0 +1,151 @@
+"""Run the benchmarks and compare them against the stored baselines.
+
+.. code-block:: none
+
+    python benchmarks/run.py                  # all bench_*.py modules
+    python benchmarks/run.py helpers import   # bench_helpers, bench_import
+    python benchmarks/run.py --update         # store baselines of new cases
+    python benchmarks/run.py --update --force # re-record all baselines
+
+The best of ``--repeat`` timings of a case is compared with its baseline,
+after scaling by the time of a fixed pure Python workload, so machines of
+different speed (or a machine that got slower under load) can share the
+baselines; ``--no-calibrate`` compares raw timings. A case is a regression
+if it is slower than its baseline by more than ``--threshold`` plus twice
+its own noise (the median over the best timing). A suspected regression is
+timed again up to three times before it is reported, and regressions make
+the script exit with status 1.
+
+``--update`` only stores baselines of cases that have none, so a noisy run
+does not silently replace the baselines later runs are checked against.
+Re-record existing baselines with ``--force`` after a deliberate change.
+"""
+from __future__ import print_function
+from importlib import import_module
+import argparse
+import gc
+import glob
+import json
+import os
+import sys
+from harness import calibrate, noise, times
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINES = os.path.join(HERE, "baselines.json")
+# times the noise of a case added to the threshold
+NOISE_FACTOR = 2
+# times a suspected regression is timed again before it is reported
+RECHECKS = 3
+
+
+def bench_modules(names):
+    if not names:
+        names = sorted(os.path.basename(path)[len("bench_"):-len(".py")]
+                       for path in glob.glob(os.path.join(HERE, "bench_*.py")))
+    return [(name, import_module("bench_" + name)) for name in names]
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {"calibration": None, "cases": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(timings, baseline, scale, threshold):
+    """Status and change of the best of sorted timings relative to its
+    baseline, with the threshold widened by the noise of the timings"""
+    if baseline is None:
+        return "new", None
+    change = timings[0] / (baseline * scale) - 1
+    limit = threshold + NOISE_FACTOR * noise(timings)
+    if change > limit:
+        return "REGRESSION", change
+    if change < -limit:
+        return "faster", change
+    return "ok", change
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("modules", nargs="*",
+                        help="benchmark modules without the bench_ prefix")
+    parser.add_argument("--update", action="store_true",
+                        help="store the timings of cases without baseline")
+    parser.add_argument("--force", action="store_true",
+                        help="with --update, also replace existing baselines")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="allowed slowdown on top of the noise of a "
+                        "case, 0.5 is 50%% (default)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="timing repetitions, the best one is used")
+    parser.add_argument("--no-calibrate", dest="calibrate",
+                        action="store_false",
+                        help="do not scale timings to the baseline machine")
+    parser.add_argument("--baselines", default=BASELINES,
+                        help="baseline file (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    baselines = load_baselines(args.baselines)
+    timings = {}
+    regressions = []
+    for name, module in bench_modules(args.modules):
+        cases = module.cases()
+        # machine speed drifts, so calibrate right before each module
+        calibration = calibrate(args.repeat)
+        scale = 1.0
+        if not baselines["calibration"]:
+            baselines["calibration"] = calibration
+        elif args.calibrate:
+            scale = calibration / baselines["calibration"]
+        print("\n%s (calibration %.3f ms, %.2fx the baseline machine)" % (
+            name, calibration * 1000, calibration / baselines["calibration"]))
+        for case in cases:
+            baseline = baselines["cases"].get(case.name)
+            case_times = times(case.func, repeat=args.repeat)
+            status, change = compare(case_times, baseline, scale,
+                                     args.threshold)
+            for i in range(RECHECKS):
+                if status != "REGRESSION":
+                    break
+                # a burst of load on the machine is not a regression
+                case_times = sorted(case_times + times(
+                    case.func, repeat=2 * args.repeat))
+                status, change = compare(case_times, baseline, scale,
+                                         args.threshold)
+            if status == "REGRESSION":
+                regressions.append(case.name)
+            seconds = case_times[0]
+            # stored baselines are on the scale of the baseline machine
+            timings[case.name] = seconds / scale
+            print("%-55s %10.3f ms %8s %s" % (
+                case.name, seconds * 1000,
+                "" if change is None else "%+.0f%%" % (change * 100), status))
+        # the plates of one module should not slow down the next one
+        del cases, case
+        gc.collect()
+
+    if args.update:
+        kept = [name for name in timings if name in baselines["cases"]]
+        if not args.force:
+            for name in kept:
+                del timings[name]
+        baselines["cases"].update(timings)
+        with open(args.baselines, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print("\nstored %s timings in %s" % (len(timings), args.baselines))
+        if kept and not args.force:
+            print("kept %s existing baselines, replace them with --force" %
+                  len(kept))
+    elif regressions:
+        print("\n%s regression(s) over %.0f%%:" % (len(regressions),
+                                                   args.threshold * 100))
+        for name in regressions:
+            print("  " + name)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
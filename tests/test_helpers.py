@@ -1,16 +1,34 @@
+import json
 import pytest
+import time
+from multiprocessing.pool import ThreadPool
 from random import sample
 from autoprotocol import Protocol
 from autoprotocol.container import Well, WellGroup, Container
+from autoprotocol.container_type import ContainerType
 from autoprotocol.unit import Unit
 from autoprotocol_utilities.container_helpers import list_of_filled_wells, \
     first_empty_well, unique_containers, sort_well_group, stamp_shape, \
     is_columnwise, plates_needed, volume_check, set_pipettable_volume, well_name, \
-    container_type_checker, get_well_list_by_cont
+    container_type_checker, get_well_list_by_cont, WellOccupancy, \
+    bulk_volume_check, pipettable_volumes, well_layout, layout_cache_info, \
+    set_layout_cache_size, clear_layout_cache, stamp_shapes
 from autoprotocol_utilities.misc_helpers import make_list, flatten_list, \
-    char_limit, det_new_group, recursive_search, transfer_properties, user_errors_group
+    char_limit, det_new_group, recursive_search, transfer_properties, user_errors_group, \
+    LRUCache, iter_flatten, iter_search, compile_search
 from autoprotocol_utilities.magnetic_helpers import get_mag_frequency, \
     get_mag_amplicenter
+from autoprotocol_utilities.rectangle import get_quadrant_indices
+
+
+# autoprotocol does not ship a 1536 well container type
+plate_1536 = ContainerType(name="1536-well test plate", is_tube=False,
+                           well_count=1536, well_depth_mm=None,
+                           well_volume_ul=Unit(12, "microliter"),
+                           well_coating=None, sterile=False, capabilities=[],
+                           shortname="1536-test", col_count=48,
+                           dead_volume_ul=Unit(2, "microliter"),
+                           safe_min_volume_ul=Unit(4, "microliter"))
 
 
 class TestContainerfunctions:
@@ -52,6 +70,73 @@ class TestContainerfunctions:
         assert not first_empty_well(self.c)
         assert not first_empty_well(self.ws)
 
+    def test_first_empty_well_list(self):
+        c = self.p.ref("testplate_first", id=None, cont_type="96-pcr",
+                       discard=True)
+        wells = c.wells_from(10, 10)
+        assert first_empty_well(wells) == 11
+        c.wells(12, 14).set_volume("10:microliter")
+        assert first_empty_well(wells) == 15
+        assert first_empty_well(list(reversed(wells))) == 15
+        assert first_empty_well(c) == 15
+
+    def test_well_occupancy(self):
+        c = self.p.ref("testplate_occupancy", id=None, cont_type="96-pcr",
+                       discard=True)
+        c.wells(2, 3, 7).set_volume("10:microliter")
+        occupancy = WellOccupancy(c)
+        assert len(occupancy) == 3
+        assert occupancy.filled(return_index=True) == [2, 3, 7]
+        assert occupancy.empty(4, return_index=True) == [0, 1, 4, 5]
+        assert occupancy.first_empty() == 8
+        assert occupancy.first_empty(return_index=False) == c.well(8)
+        assert list(occupancy.next_empty(2)) == [c.well(8), c.well(9)]
+        assert occupancy.is_filled(c.well(3))
+        assert not occupancy.is_filled(4)
+        assert list_of_filled_wells(occupancy) == list_of_filled_wells(c)
+        assert list_of_filled_wells(occupancy, empty=True) == \
+            list_of_filled_wells(c, empty=True)
+
+        occupancy.set_volume(c.wells_from(8, 4), "5:microliter")
+        assert c.well(11).volume == Unit(5, "microliter")
+        assert first_empty_well(occupancy) == 12
+        occupancy.set_volume(c.well(11), None)
+        assert c.well(11).volume is None
+        assert occupancy.first_empty() == 11
+
+        c.well(95).set_volume("1:microliter")
+        assert occupancy.first_empty() == 11
+        occupancy.update(c.well(95))
+        assert occupancy.first_empty() is None
+        assert occupancy.next_empty(1) is None
+        c.well(95).volume = None
+        occupancy.refresh()
+        assert occupancy.next_empty(85, return_index=True) == \
+            list(range(11, 96))
+        assert occupancy.next_empty(86) is None
+
+    def test_well_occupancy_first_empty_matches(self):
+        c = self.p.ref("testplate_first_match", id=None, cont_type="96-pcr",
+                       discard=True)
+        occupancy = WellOccupancy(c)
+        # empty plate
+        assert first_empty_well(c) == occupancy.first_empty() == 1
+        # only well 0 filled
+        occupancy.set_volume(c.well(0), "10:microliter")
+        assert first_empty_well(c) == occupancy.first_empty() == 1
+        # a zero volume well counts as empty
+        occupancy.set_volume(c.well(5), "0:microliter")
+        assert first_empty_well(c) == occupancy.first_empty() == 1
+        occupancy.set_volume(c.well(3), "1:microliter")
+        assert first_empty_well(c) == occupancy.first_empty() == 4
+        occupancy.set_volume(c.well(3), "0:microliter")
+        assert first_empty_well(c) == occupancy.first_empty() == 1
+        c.well(5).set_volume("2:microliter")
+        occupancy.refresh()
+        assert first_empty_well(c) == occupancy.first_empty() == 6
+        assert first_empty_well(c, return_index=False) == \
+            occupancy.first_empty(return_index=False)
+
     def test_unique_containers(self):
         wells = self.ws[:]
         assert len(unique_containers(wells)) == 1
@@ -68,6 +153,26 @@ class TestContainerfunctions:
         random_wells = sample(wells, len(wells))
         assert list(random_wells) != list(wells)
         assert list(sort_well_group(random_wells)) == list(wells)
+        assert list(sort_well_group(random_wells, columnwise=True)) == \
+            list(self.c.all_wells(columnwise=True))
+
+    @pytest.mark.parametrize("columnwise", [False, True])
+    def test_sort_well_group_containers(self, columnwise):
+        c96 = self.c.container_type
+        c384 = self.c2.container_type
+        conts = [Container("ct2", c96, name="b"), Container("ct1", c384),
+                 Container(None, c96, name="a"),
+                 Container(None, c96, name="a")]
+        wells = [w for c in conts for w in sample(c.all_wells(), 20)]
+        wells = sample(wells, len(wells))
+
+        def key(w):
+            row, col = w.container.decompose(w.index)
+            if columnwise:
+                return (w.container.id, w.container.name, col, row)
+            return (w.container.id, w.container.name, row, col)
+        assert list(sort_well_group(wells, columnwise)) == \
+            sorted(wells, key=key)
 
     @pytest.mark.parametrize("wells, full, quad, r", [
         (c.wells_from(0, 16, columnwise=True), False, False,
@@ -123,6 +228,132 @@ class TestContainerfunctions:
                 for y, well in enumerate(res[0].remaining_wells):
                     assert well.index == r[2][y]
 
+    def test_quadrant_indices(self):
+        for quad in range(4):
+            assert get_quadrant_indices(quad) == \
+                [w.index for w in self.c2.quadrant(quad)]
+
+    def test_stamp_shape_multi(self):
+        c = self.p.ref("testplate_multi", id=None, cont_type="96-pcr",
+                       discard=True)
+        wells = c.wells_from(0, 16, columnwise=True)
+        wells.extend(c.wells_from(88, 8))
+        wells.append(c.well(50))
+        res = stamp_shape(wells, full=False, multi=True, min_size=2)
+        assert [s.start_well for s in res] == [c.well(0), c.well(88)]
+        assert [s.shape for s in res] == [{"rows": 8, "columns": 2},
+                                          {"rows": 1, "columns": 8}]
+        for s in res:
+            assert s.remaining_wells == [c.well(50)]
+        res = stamp_shape(wells, full=True, multi=True)
+        assert len(res) == 1
+        assert res[0].shape == {"rows": 8, "columns": 2}
+        assert len(res[0].remaining_wells) == 9
+        res = stamp_shape(c.wells(5, 50), multi=True, min_size=2)
+        assert res[0].start_well is None
+        assert len(res[0].remaining_wells) == 2
+
+    def test_stamp_shape_1536(self):
+        c3 = Container(None, plate_1536, name="testplate_1536")
+        wells = c3.wells_from(50, 96, columnwise=True)
+        res = stamp_shape(wells, full=False)
+        assert res[0].start_well == c3.well(50)
+        assert res[0].shape == {"rows": 31, "columns": 3}
+        assert len(res[0].included_wells) == 93
+        assert [w.index for w in res[0].remaining_wells] == [3, 4, 5]
+        res = stamp_shape(wells, full=True)
+        assert res[0].start_well is None
+        assert len(res[0].remaining_wells) == 96
+
+    def test_stamp_shape_1536_quad(self):
+        c3 = Container(None, plate_1536, name="testplate_1536_quad")
+        wells = [c3.well(i) for i in get_quadrant_indices(5, 1536)]
+        wells.append(c3.well(0))
+        res = stamp_shape(wells, quad=True)
+        assert len(res) == 16
+        assert res[5].start_well == c3.well(49)
+        assert res[5].shape == {"rows": 8, "columns": 12}
+        assert len(res[5].included_wells) == 96
+        assert [s.start_well for s in res[:5] + res[6:]] == [None] * 15
+        assert res[0].remaining_wells == [c3.well(0)]
+        res = stamp_shape(wells, full=False, quad=True, multi=True)
+        assert [s.start_well for s in res] == [c3.well(0), c3.well(49)]
+
+    def test_stamp_shape_small_plates(self):
+        c6 = self.p.ref("stamp_plate_6", None, "6-flat", discard=True)
+        res = stamp_shape(c6.wells(0, 1, 2, 4))
+        assert res[0].start_well == c6.well(0)
+        assert res[0].shape == {"rows": 1, "columns": 3}
+        assert res[0].remaining_wells == [c6.well(4)]
+        c24 = self.p.ref("stamp_plate_24_quad", None, "24-deep",
+                         discard=True)
+        wells = c24.wells_from(1, 8, columnwise=True)
+        for quad in (False, True):
+            res = stamp_shape(wells, quad=quad)
+            assert len(res) == 1
+            assert res[0].start_well == c24.well(1)
+            assert res[0].shape == {"rows": 4, "columns": 2}
+        tube = self.p.ref("stamp_tube", None, "micro-1.5", discard=True)
+        res = stamp_shape([tube.well(0)])
+        assert res[0].start_well is None
+        assert list(res[0].remaining_wells) == [tube.well(0)]
+
+    def test_stamp_shapes(self):
+        c3 = self.p.ref("stamp_plate_2", None, "96-pcr", discard=True)
+        c4 = self.p.ref("stamp_plate_24", None, "24-deep", discard=True)
+        wells = self.c.wells_from(0, 40).wells + c3.wells_from(0, 20).wells
+        wells.append(c4.well(0))
+        wells.reverse()
+        plan = stamp_shapes(wells, multi=True)
+        assert [plate.container for plate in plan] == [c4, c3, self.c]
+        for plate in plan:
+            expected = stamp_shape([w for w in wells
+                                    if w.container is plate.container],
+                                   multi=True)
+            assert [s.shape for s in plate.stamps] == \
+                [s.shape for s in expected]
+            assert [s.included_wells for s in plate.stamps] == \
+                [s.included_wells for s in expected]
+            assert list(plate.remaining_wells) == \
+                list(expected[0].remaining_wells)
+        assert list(plan[0].remaining_wells) == [c4.well(0)]
+        assert [s.shape for s in plan[2].stamps] == \
+            [{"rows": 3, "columns": 12}]
+        assert len(plan[2].remaining_wells) == 4
+        c3.wells_from(0, 30).set_volume("20:microliter")
+        plan = stamp_shapes(c3, full=False)
+        assert plan[0].stamps[0].shape == {"rows": 2, "columns": 12}
+        with pytest.raises(AssertionError):
+            stamp_shapes([self.c.well(0), "A1"])
+
+    @pytest.mark.parametrize("executor", ["thread", "process"])
+    def test_stamp_shapes_executor(self, executor):
+        wells = []
+        for i, cont_type in enumerate(["96-pcr", "384-flat", "96-pcr",
+                                       "24-deep"]):
+            cont = self.p.ref("stamp_exec_%s_%s" % (executor, i), None,
+                              cont_type, discard=True)
+            count = cont.container_type.well_count
+            # plates 0 and 2 share a layout
+            wells.extend(cont.well(index)
+                         for index in range(0, count, 3 if i != 1 else 5))
+
+        def shapes(plan):
+            return [(plate.container, [(s.start_well, s.shape,
+                                        list(s.included_wells))
+                                       for s in plate.stamps],
+                     list(plate.remaining_wells)) for plate in plan]
+        for kwargs in [{}, {"multi": True, "full": False},
+                       {"quad": True, "multi": True, "optimal": True}]:
+            clear_layout_cache()
+            serial = shapes(stamp_shapes(wells, **kwargs))
+            clear_layout_cache()
+            assert shapes(stamp_shapes(wells, executor=executor,
+                                       processes=2, **kwargs)) == serial
+            # the layouts are cached now
+            assert shapes(stamp_shapes(wells, executor=executor,
+                                       **kwargs)) == serial
+
     @pytest.mark.parametrize("len_wells, columnwise, r", [
         (8, True, True),
         (8, False, False),
@@ -137,6 +368,62 @@ class TestContainerfunctions:
         wells.append(self.c.well(14))
         assert is_columnwise(wells) is False
 
+    def test_is_columnwise_edge_cases(self):
+        assert is_columnwise(self.w) is False
+        assert is_columnwise([self.c.well(3)]) is True
+        assert is_columnwise([self.c.well(12)]) is False
+        wells = self.c.wells_from(11, 8, columnwise=True).wells
+        assert is_columnwise(wells) is True
+        assert is_columnwise(wells + [self.c.well(95)]) is False
+        assert is_columnwise([self.w, self.c2.well(0)]) == \
+            ["is_columnwise: wells have to come from one container"]
+
+    @pytest.mark.parametrize("wells, layout", [
+        (c.wells_from(0, 17, columnwise=True),
+         ("columnwise", True, 0, 2, 17, 8, 3)),
+        (c.wells_from(13, 6, columnwise=True),
+         ("columnwise", False, 13, 73, 6, 6, 1)),
+        (c.wells_from(12, 14), ("rowwise", True, 12, 25, 14, 2, 12)),
+        (c.wells(14, 15, 26, 27), ("block", False, 14, 27, 4, 2, 2)),
+        (c.wells(0, 1, 12, 13, 13), ("block", True, 0, 13, 4, 2, 2)),
+        (c.wells(0, 14, 5), ("scattered", False, 0, 14, 3, 2, 6))
+    ])
+    def test_well_layout(self, wells, layout):
+        res = well_layout(wells)
+        assert res.container is self.c
+        assert tuple(res[1:]) == layout
+
+    def test_well_layout_asserts(self):
+        with pytest.raises(AssertionError):
+            well_layout([])
+        with pytest.raises(AssertionError):
+            well_layout([self.w, self.c2.well(0)])
+        assert well_layout(self.w).orientation == "columnwise"
+
+    def test_layout_cache(self):
+        clear_layout_cache()
+        wells = self.c.wells_from(0, 16)
+        assert well_layout(wells) == well_layout(list(reversed(wells)))
+        assert is_columnwise(wells) is False
+        info = layout_cache_info()
+        assert (info.hits, info.misses, info.currsize) == (2, 1, 1)
+        first = stamp_shape(wells)
+        again = stamp_shape(wells)
+        assert again[0].shape == first[0].shape
+        assert again[0].included_wells == first[0].included_wells
+        assert layout_cache_info().hits == 3
+        # the key follows the filled wells of a container
+        c = self.p.ref("layout_plate", None, "96-pcr", discard=True)
+        c.wells_from(0, 12).set_volume("10:microliter")
+        assert stamp_shape(c)[0].shape == {"rows": 1, "columns": 12}
+        c.wells_from(12, 12).set_volume("10:microliter")
+        assert stamp_shape(c)[0].shape == {"rows": 2, "columns": 12}
+        set_layout_cache_size(1)
+        assert layout_cache_info().currsize == 1
+        clear_layout_cache()
+        set_layout_cache_size(512)
+        assert layout_cache_info() == (0, 0, 512, 0)
+
     def test_plates_needed(self):
         assert plates_needed(35, self.c) == 1
         assert plates_needed(350, self.c2) == 1
@@ -166,6 +453,31 @@ class TestContainerfunctions:
         assert isinstance(new_well, list)
         assert new_well[0].volume == old_vol - Unit(3, "microliter")
         assert new_well[1].volume == old_vol - Unit(15, "microliter")
+        # the volume keeps the unit of the well
+        self.c.well(0).set_volume("0.067:milliliter")
+        set_pipettable_volume(self.c.well(0))
+        assert str(self.c.well(0).volume) == "0.064:milliliter"
+
+    def test_pipettable_volumes(self):
+        myc = self.p.ref("testplate_pipettable", id=None, cont_type="96-pcr",
+                         discard=True)
+        myc.wells_from(0, 10).set_volume("20:microliter")
+        myc.well(2).set_volume("0.05:milliliter")
+        wells = [self.c2.well(0).set_volume("60:microliter"), myc.well(2),
+                 myc.well(0)]
+        res = pipettable_volumes(wells)
+        assert res.wells == wells
+        assert list(res.volumes) == [45.0, 47.0, 17.0]
+        assert myc.well(2).volume == Unit(0.05, "milliliter")
+        res = pipettable_volumes(myc, use_safe_vol=True)
+        assert res.wells == list(myc.wells_from(0, 10))
+        assert list(res.volumes) == [15.0, 15.0, 45.0] + [15.0] * 7
+        assert set_pipettable_volume(myc, use_safe_vol=True) is myc
+        assert [w.volume for w in myc.wells_from(0, 10)] == \
+            [Unit(v, "microliter") for v in res.volumes]
+        assert myc.well(10).volume is None
+        with pytest.raises(AssertionError):
+            pipettable_volumes(myc.well(10))
 
     def test_volume_check(self):
         self.c.all_wells().set_volume("20:microliter")
@@ -182,6 +494,54 @@ class TestContainerfunctions:
         assert volume_check(self.c.well(25), 0,
                             use_safe_vol=True) is not None
 
+    def test_bulk_volume_check(self):
+        self.c.all_wells().set_volume("20:microliter")
+        self.c.wells_from(15, 10).set_volume("2:microliter")
+        self.c.wells_from(30, 15).set_volume("4:microliter")
+        self.c2.all_wells().set_volume("16:microliter")
+        wells = list(self.c.wells_from(10, 30)) + [self.c.well(90)] + \
+            list(self.c2.wells_from(0, 3))
+        self.c.well(90).set_volume("0:microliter")
+        for usage in [0, 1, 5, Unit(2, "microliter")]:
+            for kwargs in [{}, {"use_safe_vol": True},
+                           {"use_safe_dead_diff": True}]:
+                res = bulk_volume_check(wells, usage, **kwargs)
+                msgs = res.error_messages()
+                assert len(res) == len(msgs)
+                assert bool(res) == bool(msgs)
+                if msgs:
+                    assert str(res) == "%s volume errors: %s" % (
+                        len(msgs), ", ".join(msgs))
+        res = bulk_volume_check(wells, 1)
+        assert res.missing_volume == [self.c.well(90)]
+        assert res.failing_wells == wells[5:15] + [self.c.well(90)]
+        assert list(res.required) == [4.0] * 11
+        assert len(bulk_volume_check(wells, 2).failing_wells) == 24
+        assert list(res.available[:2]) == [2.0, 2.0]
+        assert not bulk_volume_check(self.c.wells_from(0, 10), 1)
+
+    def test_volume_check_structured(self):
+        self.c.all_wells().set_volume("20:microliter")
+        self.c.wells_from(15, 2).set_volume("2:microliter")
+        res = volume_check(self.c.wells_from(14, 3), 1, structured=True)
+        assert res.failing_wells == list(self.c.wells_from(15, 2))
+        assert repr(res) == "VolumeCheckResult(2 failing, 0 without volume)"
+        assert str(res) == volume_check(self.c.wells_from(14, 3), 1)
+        assert str(res).startswith(
+            "2 volume errors: You want to pipette 1.0 ul from a container "
+            "with 3.0 ul dead volume (4.0 ul total). However, your aliquot: "
+            "testplate_pcr-15, only has 2.0 ul.")
+        report = json.loads(res.to_json())
+        assert report["errors"] == 2
+        assert report["failing_wells"][0] == {
+            "container": "testplate_pcr", "index": 15,
+            "name": "testplate_pcr-15", "required_ul": 4.0,
+            "available_ul": 2.0}
+        assert report["missing_volume"] == []
+        res = volume_check(self.c.wells_from(0, 3), 1, structured=True)
+        assert not res
+        assert res.to_dict()["errors"] == 0
+
     def test_well_name(self):
         assert well_name(self.c.well(0)) == "testplate_pcr-0"
         assert well_name(self.c.well(0), 'pytest') == "pytest-0"
@@ -211,6 +571,13 @@ class TestContainerfunctions:
         ws3 = ws + ws2
         r = {myc: list(ws), myc2: list(ws2)}
         assert get_well_list_by_cont(ws3) == r
+        mixed = [ws2[3], ws[1], ws2[0], ws[0]]
+        res = get_well_list_by_cont(mixed, ordered=True)
+        assert list(res.keys()) == [myc2, myc]
+        assert res[myc2] == [ws2[3], ws2[0]]
+        assert res[myc] == [ws[1], ws[0]]
+        assert unique_containers(mixed) == [myc2, myc]
+        assert unique_containers([mixed[:2], [mixed[2:]]]) == [myc2, myc]
 
     def test_user_errors_group(self):
         assert user_errors_group([None]) is None
@@ -227,12 +594,47 @@ class TestDataformattingfunctions:
     def test_flatten_list(self):
         l = [[1, 2], [3, 4], [[5, 6], [[7, 8], [9, 10], 11], 12], 13]
         assert flatten_list(l) == [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13]
+        assert flatten_list(5) == [5]
+        assert flatten_list([[], [[]], 1]) == [1]
+
+    def test_iter_flatten(self):
+        p = Protocol()
+        c = p.ref("testplate_flatten", id=None, cont_type="96-pcr",
+                  discard=True)
+        l = [c.wells_from(0, 2), (1, [2]), [[c.well(5)]], "ab"]
+        gen = iter_flatten(l)
+        assert next(gen) is l[0]
+        assert list(gen) == [(1, [2]), c.well(5), "ab"]
+        assert flatten_list(l, types=(list, tuple, WellGroup)) == [
+            c.well(0), c.well(1), 1, 2, c.well(5), "ab"]
+        deep = []
+        inner = deep
+        for i in range(5000):
+            inner.append([i])
+            inner = inner[-1]
+        assert flatten_list(deep) == list(range(5000))
 
     def test_det_new_group(self):
         base = 12
         for x in range(0,13):
             assert (det_new_group(i=x, base=12)) == (x==12)
 
+    def test_lru_cache(self):
+        cache = LRUCache(maxsize=2)
+        cache["a"] = 1
+        cache["b"] = 2
+        assert cache.get("a") == 1
+        cache["c"] = 3
+        assert "b" not in cache
+        assert cache.get("b", "missing") == "missing"
+        assert cache.info() == (1, 1, 2, 2)
+        cache.resize(1)
+        assert "c" in cache and len(cache) == 1
+        cache.clear()
+        assert cache.info() == (0, 0, 1, 0)
+        with pytest.raises(AssertionError):
+            LRUCache(maxsize=0)
+
     @pytest.mark.parametrize("string, length, trunc, clip, r", [
         ('ILoveThis', 6, False, False, ['ILoveThis', 'The specified label']),
         ('ILoveThis', 6, False, True, ['veThis', None]),
@@ -280,6 +682,131 @@ class TestRecursiveParams:
     def test_recursive_search_instance(self, params, cl, expected):
         assert len(recursive_search(params, cl)) == expected
 
+    def test_recursive_search_order(self):
+        params = {"a": [1, ("b", {(2, 3): [4]})]}
+        assert recursive_search(params) == ["a", 1, "b", (2, 3), 4]
+        assert recursive_search(params, tuple) == [(2, 3)]
+        assert recursive_search(7) == [7]
+        with pytest.raises(Exception):
+            recursive_search(params, int, "not callable")
+
+    def test_iter_search(self):
+        assert next(iter_search(self.well_list, Well)) == self.c1.well(45)
+        assert list(iter_search(self.well_list, Well, limit=3)) == \
+            recursive_search(self.well_list, Well)[:3]
+        checked = []
+
+        def check(well):
+            checked.append(well)
+            return well.index
+
+        results = iter_search(self.well_list, Well, check)
+        assert checked == []
+        assert next(results) == 45
+        assert checked == [self.c1.well(45)]
+        assert list(iter_search(self.well_list, Well, check, limit=2)) == \
+            [45, 0]
+        deep = [self.c1.well(0)]
+        for i in range(5000):
+            deep = {"level": [deep]}
+        assert recursive_search(deep, Well) == [self.c1.well(0)]
+
+    def test_compile_search(self):
+        plan = compile_search(self.well_list, Well)
+        assert len(plan.paths) == 11
+        assert plan.paths[0] == ("well_list", 0, "hidden_well")
+        assert plan.search(self.well_list) == \
+            recursive_search(self.well_list, Well)
+        c2 = self.protocol.ref("plate2", None, "96-pcr", discard=True)
+        c2.all_wells().set_volume("40:microliter")
+        same_shape = {"well_list": [{"hidden_well": c2.well(0)}] +
+                      c2.wells_from(1, 10).wells}
+        assert plan.search(same_shape, volume_check,
+                           {'usage_volume': 45}) == \
+            recursive_search(same_shape, Well, volume_check,
+                             {'usage_volume': 45})
+        assert (plan.hits, plan.misses) == (2, 0)
+        # another shape falls back to a full search
+        assert plan.search(self.well_dict) == \
+            recursive_search(self.well_dict, Well)
+        longer = {"well_list": same_shape["well_list"] + [c2.well(20)]}
+        assert plan.search(longer)[-1] == c2.well(20)
+        assert (plan.hits, plan.misses) == (2, 2)
+        with pytest.raises(Exception):
+            plan.search(self.well_list, "not callable")
+        with pytest.raises(AssertionError):
+            compile_search(self.well_list, None)
+
+    def test_search_plan_schema_changes(self):
+        c2 = self.protocol.ref("plate_schema", None, "96-pcr", discard=True)
+
+        def launch(source, name, dry_run=False, options={"replicates": 3}):
+            return {"samples": [{"source": source, "name": name},
+                                {"source": c2.well(1), "name": "b"}],
+                    "dry_run": dry_run, "options": options}
+        plan = compile_search(launch(c2.well(0), "a"), Well)
+        same = launch(c2.well(2), "c")
+        assert plan.search(same) == recursive_search(same, Well)
+        assert (plan.hits, plan.misses) == (1, 0)
+        renamed = launch(c2.well(3), "a")
+        renamed["samples"][0]["src"] = renamed["samples"][0].pop("source")
+        new_key = launch(c2.well(4), "a")
+        new_key["control"] = c2.well(5)
+        new_leaves = [launch(c2.well(6), c2.well(7)),
+                      launch(c2.well(8), "a", dry_run=c2.well(9)),
+                      launch(c2.well(10), ["a", c2.well(11)]),
+                      launch(c2.well(12), "a", options={"replicates":
+                                                        c2.well(13)}),
+                      launch("none", "a")]
+        for changed in [renamed, new_key] + new_leaves:
+            assert plan.search(changed) == recursive_search(changed, Well)
+        assert (plan.hits, plan.misses) == (1, 7)
+        assert c2.well(7) in plan.search(new_leaves[0])
+        assert plan.search(new_leaves[4]) == [c2.well(1)]
+
+    def test_search_plan_instance_key_with_leaf(self):
+        c2 = self.protocol.ref("plate_key", None, "96-pcr", discard=True)
+        plan = compile_search({"b": c2.well(1), c2.well(90): None}, Well)
+        changed = {"b": c2.well(3), c2.well(90): c2.well(4)}
+        assert plan.search(changed) == recursive_search(changed, Well)
+        assert c2.well(4) in plan.search(changed)
+        assert (plan.hits, plan.misses) == (0, 2)
+        same = {"b": c2.well(3), c2.well(90): "x"}
+        assert plan.search(same) == recursive_search(same, Well)
+        assert plan.hits == 1
+
+    def test_recursive_search_executor(self):
+        args = {'usage_volume': 60}
+        serial = recursive_search(self.well_dict, Well, volume_check, args)
+        assert len(serial) == 1
+        assert recursive_search(self.well_dict, Well, volume_check, args,
+                                executor="thread", chunksize=3) == serial
+        pool = ThreadPool(2)
+        try:
+            assert recursive_search(self.well_list, Well, volume_check, args,
+                                    executor=pool) == \
+                recursive_search(self.well_list, Well, volume_check, args)
+        finally:
+            pool.close()
+            pool.join()
+        names = [well_name(w) for w in recursive_search(self.well_list, Well)]
+        assert recursive_search(self.well_list, Well, well_name,
+                                executor="process", processes=2) == names
+        with pytest.raises(AssertionError):
+            recursive_search(self.well_list, Well, well_name,
+                             executor="threads")
+
+    def test_recursive_search_executor_order(self):
+        wells = list(self.c1.wells_from(0, 8))
+
+        def slow_index(well):
+            # later wells finish first
+            time.sleep(0.001 * (8 - well.index))
+            return well.index
+        assert recursive_search(wells, Well, slow_index, executor="thread",
+                                chunksize=1, processes=8) == \
+            recursive_search(wells, Well, slow_index) == list(range(8))
+
 
 class TestPropertyFunctions:
     p = Protocol()
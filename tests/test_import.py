@@ -0,0 +1,55 @@
+import subprocess
+import sys
+
+
+def run_python(code):
+    return subprocess.check_output([sys.executable, "-c", code]).decode()
+
+
+class TestLazyImport:
+    def test_import_does_not_load_helpers(self):
+        out = run_python(
+            "import sys, autoprotocol_utilities\n"
+            "print(sorted(m for m in sys.modules if m.split('.')[0] in "
+            "('autoprotocol', 'pint', 'numpy') or "
+            "m.startswith('autoprotocol_utilities.') and "
+            "sys.modules[m] is not None))")
+        assert out.strip() == "[]"
+
+    def test_attribute_access(self):
+        import autoprotocol_utilities
+        from autoprotocol_utilities import container_helpers
+        from autoprotocol_utilities import volume_check, LRUCache
+        assert volume_check is container_helpers.volume_check
+        assert autoprotocol_utilities.LRUCache is LRUCache
+        assert autoprotocol_utilities.rectangle.max_rectangle
+        assert "thermocycle_ramp" in dir(autoprotocol_utilities)
+        assert "magnetic_helpers" in dir(autoprotocol_utilities)
+        assert "volume_check" in autoprotocol_utilities.__all__
+        try:
+            autoprotocol_utilities.not_a_helper
+        except AttributeError:
+            pass
+        else:
+            assert False, "expected an AttributeError"
+
+    def test_magnetic_helpers_import_first(self):
+        out = run_python(
+            "from autoprotocol_utilities.magnetic_helpers import "
+            "get_mag_amplicenter\n"
+            "print(get_mag_amplicenter.__name__)")
+        assert out.strip() == "get_mag_amplicenter"
+
+    def test_helpers_load_on_first_use(self):
+        out = run_python(
+            "import sys, autoprotocol_utilities as a\n"
+            "def loaded():\n"
+            "    return [m for m in ('misc_helpers', 'container_helpers') if "
+            "sys.modules.get('autoprotocol_utilities.' + m) is not None]\n"
+            "print(loaded())\n"
+            "a.flatten_list\n"
+            "print(loaded())\n"
+            "a.volume_check\n"
+            "print(loaded())")
+        assert out.splitlines() == [
+            "[]", "['misc_helpers']", "['misc_helpers', 'container_helpers']"]
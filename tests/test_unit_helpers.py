@@ -0,0 +1,55 @@
+import pytest
+from autoprotocol.unit import Unit
+from autoprotocol_utilities.unit_helpers import parse_quantity, \
+    base_magnitude, to_microliters, to_seconds, to_celsius, to_unit, \
+    parse_cache_info, set_parse_cache_size, clear_parse_cache
+
+
+class TestUnitHelpers:
+    def test_parse_quantity(self):
+        quantity = parse_quantity("10:microliter")
+        assert quantity.magnitude == 10.0
+        assert quantity.units == Unit(1, "microliter")._units
+        assert quantity.name == "microliter"
+        unit = Unit(3, "minute")
+        assert parse_quantity(unit) == (3.0, unit._units, "minute")
+        with pytest.raises(Exception):
+            parse_quantity("10 microliter")
+        with pytest.raises(Exception):
+            parse_quantity(None)
+
+    def test_conversions(self):
+        assert to_microliters("0.5:milliliter") == 500.0
+        assert to_microliters(Unit(20, "microliter")) == 20.0
+        assert to_microliters(7) == 7.0
+        assert to_seconds("2:minute") == 120.0
+        assert to_seconds(Unit(1500, "millisecond")) == 1.5
+        assert to_celsius(65) == 65.0
+        assert to_celsius("95:celsius") == 95.0
+        assert to_celsius(Unit(300, "kelvin")) == pytest.approx(26.85)
+        with pytest.raises(Exception):
+            to_microliters("1:minute")
+        for value in ["20:microliter", Unit(0.3, "milliliter"), "1:hour"]:
+            assert base_magnitude(value) == \
+                Unit.fromstring(value).to_base_units().magnitude
+
+    def test_parse_cache(self):
+        clear_parse_cache()
+        quantity = parse_quantity("10:microliter")
+        assert parse_quantity("10:microliter") is quantity
+        parse_quantity(Unit(1, "second"))
+        info = parse_cache_info()
+        assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+        set_parse_cache_size(2)
+        for value in ["1:second", "2:second", "10:microliter"]:
+            parse_quantity(value)
+        assert parse_cache_info() == (1, 4, 2, 2)
+        clear_parse_cache()
+        set_parse_cache_size(1024)
+
+    def test_to_unit(self):
+        unit = to_unit("10:microliter")
+        assert unit == Unit(10, "microliter")
+        assert str(unit) == "10.0:microliter"
+        unit.ito("milliliter")
+        assert to_unit("10:microliter") == Unit(10, "microliter")